@@ -1,9 +1,15 @@
 import os
-import requests
+import sys
 import pyodbc
 from datetime import datetime, timedelta, time, timezone
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scripts"))
+from common.graph import CALENDAR_SELECT, GraphTokenProvider, batch_get, iter_calendar_events
+from common.availability import AvailabilityModel
+from common.meeting_slots import find_meeting_slots
+
 
 # -----------------------------
 # Load environment variables
@@ -18,6 +24,9 @@ SQL_SERVER = os.getenv("SQL_SERVER")
 SQL_DB = os.getenv("SQL_DB")
 LOCAL_TZ = os.getenv("LOCAL_TZ", "Africa/Johannesburg")
 
+# One client-credentials token shared by every user lookup in the run
+graph_tokens = GraphTokenProvider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+
 WORK_START = time(8, 0)
 WORK_END = time(17, 0)
 SLOT_MINUTES = 30
@@ -148,56 +157,91 @@ FREE_AFTERNOON: {str(afternoon_free)}
 
 
 
+def build_availability(all_events):
+    """
+    Bitmask availability for every user over the current week (see common.availability).
+    Built from the whole events, not the work-hour slots in `formatted`; the
+    model clips to work hours itself when queried.
+    """
+    return AvailabilityModel.from_events(
+        {user: [(start, end) for start, end, _ in busy] for user, (_, _, busy) in all_events.items()},
+        get_week_dates(),
+    )
+
+
+def team_free_windows(availability, users, minutes=60, limit=None):
+    """Earliest windows of at least `minutes` inside work hours when all `users` are free."""
+    return availability.common_free_windows(users, minutes, WORK_START, WORK_END, limit)
+
+
+def find_team_meeting_slots(all_events, users, minutes=60, limit=5):
+    """
+    Ranked meeting windows this week for `users` (see common.meeting_slots):
+    no busy/oof booking for anyone, fewest tentative ones first, then earliest.
+    Reads the whole events, which the finder clips to work hours.
+    """
+    busy = {user: all_events[user][2] for user in users}
+    return find_meeting_slots(busy, get_week_dates(), timedelta(minutes=minutes), WORK_START, WORK_END, limit)
+
+
 # -----------------------------
 # Outlook Graph API Handling
 # -----------------------------
-def get_outlook_events(user_email):
-    token_url = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
-
-    token_data = {
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "scope": "https://graph.microsoft.com/.default",
-        "grant_type": "client_credentials",
-    }
-
-    token_resp = requests.post(token_url, data=token_data)
-    token_resp.raise_for_status()
-    access_token = token_resp.json()["access_token"]
+def fetch_first_responses(user_emails):
+    """
+    Profile and first calendarview page for every user in as few Graph $batch
+    calls as possible (20 sub-requests each) instead of two requests per user.
+    """
+    weekdays = get_week_dates()
+    params = urlencode({
+        "startDateTime": f"{weekdays[0]}T00:00:00",
+        "endDateTime": f"{weekdays[-1]}T23:59:59",
+        "$top": 2000,
+        "$select": CALENDAR_SELECT,
+    })
+
+    paths = {}
+    for user_email in user_emails:
+        paths[f"profile:{user_email}"] = f"/users/{user_email}?$select=displayName"
+        paths[f"events:{user_email}"] = f"/users/{user_email}/calendarview?{params}"
+
+    return batch_get(
+        graph_tokens.token(),
+        paths,
+        headers={"Prefer": f'outlook.timezone="{LOCAL_TZ}"'},
+    )
 
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Prefer": f'outlook.timezone="{LOCAL_TZ}"',
-    }
 
+def get_outlook_events(user_email, profile, first_page):
     # Get First Name
-    user_info = requests.get(f"https://graph.microsoft.com/v1.0/users/{user_email}", headers=headers)
-    display_name = user_info.json().get("displayName") if user_info.status_code == 200 else None
+    status, body = profile
+    display_name = body.get("displayName") if status == 200 else None
     first_name = extract_first_name(user_email, display_name)
 
     # Fetch events for current week
-    weekdays = get_week_dates()
-    start_str = f"{weekdays[0]}T00:00:00"
-    end_str = f"{weekdays[-1]}T23:59:59"
-
-    url = (
-        f"https://graph.microsoft.com/v1.0/users/{user_email}/calendarview"
-        f"?startDateTime={start_str}&endDateTime={end_str}&$top=2000"
+    status, body = first_page
+    if status >= 400:
+        raise RuntimeError(f"calendarview failed for {user_email}: {status} {body.get('error', body)}")
+
+    # Only follow-up pages are requested one by one
+    events = iter_calendar_events(
+        graph_tokens.token(),
+        first_page=body,
+        headers={"Prefer": f'outlook.timezone="{LOCAL_TZ}"'},
     )
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    events = resp.json().get("value", [])
 
     formatted = []
+    busy = []
 
     for ev in events:
-        status = ev.get("showAs", "busy").lower()
+        status = ev.show_as.lower()
         if status not in {"busy", "tentative", "oof"}:
             continue
 
-        start_dt = datetime.fromisoformat(ev["start"]["dateTime"])
-        end_dt = datetime.fromisoformat(ev["end"]["dateTime"])
-        subject = ev.get("subject", "No subject")
+        start_dt = datetime.fromisoformat(ev.start)
+        end_dt = datetime.fromisoformat(ev.end)
+        subject = ev.subject
+        busy.append((start_dt, end_dt, status))
 
         current = start_dt
         while current < end_dt:
@@ -219,7 +263,7 @@ def get_outlook_events(user_email):
     for ev in formatted:
         ev["load_percentage"] = round(slots_by_date[ev["date"]] / TOTAL_SLOTS_PER_DAY, 2)
 
-    return formatted, first_name
+    return formatted, first_name, busy
 
 
 # -----------------------------
@@ -258,7 +302,7 @@ def write_to_db(all_events):
     """
 
     for user, data in all_events.items():
-        events, first_name = data
+        events, first_name, _ = data
 
         # Insert events
         for ev in events:
@@ -326,7 +370,11 @@ def write_to_db(all_events):
 # Main
 # -----------------------------
 def main():
-    all_events = {user: get_outlook_events(user) for user in OUTLOOK_USER_EMAILS}
+    responses = fetch_first_responses(OUTLOOK_USER_EMAILS)
+    all_events = {
+        user: get_outlook_events(user, responses[f"profile:{user}"], responses[f"events:{user}"])
+        for user in OUTLOOK_USER_EMAILS
+    }
     write_to_db(all_events)
 
 
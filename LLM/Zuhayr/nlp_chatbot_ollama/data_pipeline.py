@@ -14,6 +14,8 @@ SQL_DATABASE = os.getenv("SQL_DATABASE")
 SQL_DRIVER = os.getenv("SQL_DRIVER")
 
 RAW_INPUT_FILE = os.getenv("RAW_INPUT_FILE")
+# Optional comma-separated YYYY-MM months to read when RAW_INPUT_FILE is the event store
+RAW_INPUT_MONTHS = os.getenv("RAW_INPUT_MONTHS")
 TRANSFORMED_OUTPUT_FILE = os.getenv("TRANSFORMED_OUTPUT_FILE")
 
 CSV_SEP = "`"
@@ -69,11 +71,35 @@ with pyodbc.connect(conn_str, autocommit=True) as conn:
     print(f"Database '{SQL_DATABASE}' is ready!")
 
 
+# Read the Parquet event store (data/store/calendar_events) in the raw CSV's column layout,
+# loading only the columns used below and, if RAW_INPUT_MONTHS is set, only those months
+def read_event_store(path):
+    months = [m.strip() for m in RAW_INPUT_MONTHS.split(",")] if RAW_INPUT_MONTHS else None
+    df = pd.read_parquet(
+        path,
+        columns=["user_email", "date", "start_dt", "end_dt", "subject", "load_pct"],
+        filters=[("month", "in", months)] if months else None,
+    )
+    df = df.rename(columns={
+        "start_dt": "start_time",
+        "end_dt": "end_time",
+        "subject": "meeting_subject",
+        "load_pct": "load_percentage",
+    })
+    df["meeting_subject"] = df["meeting_subject"].astype(object).replace("", np.nan)
+    df["user_email"] = df["user_email"].astype(str)
+    df["first_name"] = df["user_email"].str.split("@").str[0].str.split(".").str[0].str.capitalize()
+    return df
+
+
 # Parse raw CSV and enrich with calculated fields for analysis
 def transform_meeting_data():
-    print(f"Loading raw CSV: {RAW_INPUT_FILE}")
-
-    df = pd.read_csv(RAW_INPUT_FILE, sep=CSV_SEP)
+    if os.path.isdir(RAW_INPUT_FILE):
+        print(f"Loading event store: {RAW_INPUT_FILE}")
+        df = read_event_store(RAW_INPUT_FILE)
+    else:
+        print(f"Loading raw CSV: {RAW_INPUT_FILE}")
+        df = pd.read_csv(RAW_INPUT_FILE, sep=CSV_SEP)
 
     # Convert string columns to proper datetime objects for time calculations
     for col in ["date", "start_time", "end_time"]:
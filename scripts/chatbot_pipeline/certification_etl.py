@@ -1,11 +1,17 @@
 from __future__ import annotations
+import argparse
 import os
-from typing import Any
+import sys
+import time
+from typing import Any, Iterable, Iterator
 import numpy as np
 import pandas as pd
-import requests
 from sqlalchemy import create_engine, text
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.clickup import ClickUpClient
+from common.state import read_json, state_path, write_json
+
 
 # ---------------------------------------------------------------------------
 # Config (all sourced from environment variables / GitHub Actions secrets)
@@ -13,7 +19,6 @@ from sqlalchemy import create_engine, text
 
 CLICKUP_API_TOKEN = os.environ["CLICKUP_API_TOKEN"]
 CLICKUP_LIST_ID   = os.environ["CLICKUP_LIST_ID"]
-BASE_URL          = f"https://api.clickup.com/api/v2/list/{CLICKUP_LIST_ID}/task"
 
 SNOWFLAKE_ACCOUNT   = os.environ["SNOWFLAKE_ACCOUNT"]
 SNOWFLAKE_USER      = os.environ["SNOWFLAKE_USER"]
@@ -53,23 +58,57 @@ OUTPUT_COLUMNS = [
 
 TABLE_NAME = "FACT_EMPLOYEE_CERTIFICATION"
 
+# Incremental mode keeps every task seen so far plus the highest date_updated
+# it has synced, so each run only asks ClickUp for tasks changed since then
+SNAPSHOT_FILE = state_path(f"certification_tasks_{CLICKUP_LIST_ID}.json")
+
+# A snapshot seeded longer ago than this is dropped and rebuilt from a full
+# fetch, which also clears out tasks deleted in ClickUp since the last seed
+RESEED_DAYS = float(os.getenv("CERT_RESEED_DAYS", "7"))
+
 
 # ---------------------------------------------------------------------------
 # Extract
 # ---------------------------------------------------------------------------
 
-def fetch_tasks() -> list[dict[str, Any]]:
-    headers  = {"Authorization": CLICKUP_API_TOKEN}
-    response = requests.get(
-        BASE_URL,
-        headers=headers,
-        params={"subtasks": "true"},
-        timeout=60,
-    )
-    response.raise_for_status()
-    tasks = response.json().get("tasks", [])
-    print(f"[extract] Tasks fetched: {len(tasks)}")
-    return tasks
+def fetch_tasks(params: dict[str, Any] | None = None) -> Iterator[dict[str, Any]]:
+    """
+    Streams every task of the certification list. ClickUp pages at 100 tasks,
+    so the next page is prefetched while the current one is being normalised.
+    """
+    client = ClickUpClient(CLICKUP_API_TOKEN, raise_errors=True)
+    count  = 0
+    for task in client.iter_tasks(CLICKUP_LIST_ID, params):
+        count += 1
+        yield task
+    print(f"[extract] Tasks fetched: {count}")
+
+
+def sync_tasks(snapshot: dict[str, Any]) -> dict[str, Any]:
+    """
+    Fetches only tasks updated after the snapshot's watermark and merges them
+    in by task id. An empty snapshot falls through to a full fetch.
+
+    Closed tasks are asked for too, so a task closed since it was cached is
+    dropped, as a full fetch (open tasks only) would leave it out. Tasks
+    deleted in ClickUp stay until the snapshot is next reseeded.
+    """
+    watermark = snapshot.get("watermark")
+    tasks     = dict(snapshot.get("tasks", {}))
+    params    = {"date_updated_gt": watermark, "include_closed": "true"} if watermark else None
+    seeded_at = snapshot.get("seeded_at") if watermark else int(time.time())
+
+    changed = 0
+    for task in fetch_tasks(params):
+        if (task.get("status") or {}).get("type") == "closed":
+            tasks.pop(task["id"], None)
+        else:
+            tasks[task["id"]] = task
+        watermark = max(int(watermark or 0), int(task.get("date_updated") or 0)) or None
+        changed  += 1
+
+    print(f"[extract] {changed} changed tasks merged → snapshot holds {len(tasks)}")
+    return {"list_id": CLICKUP_LIST_ID, "watermark": watermark, "seeded_at": seeded_at, "tasks": tasks}
 
 
 # ---------------------------------------------------------------------------
@@ -93,7 +132,7 @@ def parse_epoch_or_iso(series: pd.Series) -> pd.Series:
     return parsed_epoch.where(parsed_epoch.notna(), parsed_iso)
 
 
-def normalize_tasks(tasks: list[dict[str, Any]]) -> pd.DataFrame:
+def normalize_tasks(tasks: Iterable[dict[str, Any]]) -> pd.DataFrame:
     rows = []
     for task in tasks:
         assignees  = task.get("assignees") or []
@@ -199,7 +238,7 @@ def build_completed(df: pd.DataFrame) -> pd.DataFrame:
     return done[OUTPUT_COLUMNS]
 
 
-def transform(tasks: list[dict[str, Any]]) -> pd.DataFrame:
+def transform(tasks: Iterable[dict[str, Any]]) -> pd.DataFrame:
     df = normalize_tasks(tasks)
     df = add_employment_status(df)
     df = add_technology(df)
@@ -251,10 +290,35 @@ def push_to_snowflake(df: pd.DataFrame) -> None:
 # ---------------------------------------------------------------------------
 
 def main() -> None:
-    tasks  = fetch_tasks()
-    result = transform(tasks)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mode",
+        choices=["full", "incremental"],
+        default=os.getenv("CERT_SYNC_MODE", "full"),
+        help="incremental: fetch only tasks changed since the last successful run",
+    )
+    args = parser.parse_args()
+
+    if args.mode == "full":
+        result = transform(fetch_tasks())
+        push_to_snowflake(result)
+        # Drop any stale snapshot so the next incremental run reseeds from scratch
+        if os.path.exists(SNAPSHOT_FILE):
+            os.remove(SNAPSHOT_FILE)
+        return
+
+    snapshot = read_json(SNAPSHOT_FILE, {})
+    if snapshot and time.time() - snapshot.get("seeded_at", 0) > RESEED_DAYS * 86400:
+        print(f"[extract] Snapshot is over {RESEED_DAYS:g} days old → reseeding from a full fetch")
+        snapshot = {}
+
+    snapshot = sync_tasks(snapshot)
+    result   = transform(snapshot["tasks"].values())
     push_to_snowflake(result)
 
+    # Only advance the watermark once the load has succeeded
+    write_json(SNAPSHOT_FILE, snapshot)
+
 
 if __name__ == "__main__":
     main()
@@ -1,120 +1,51 @@
 import os
-import csv
-import requests
-import pytz
-from datetime import datetime, timedelta, time
-# from dotenv import load_dotenv
+import sys
+import pandas as pd
+from datetime import timedelta
 
-# --- Load environment variables ---
-# load_dotenv() # only necessary for testing on local machine. Github doesn't have dotenv lib
-
-TENANT_ID = os.environ["TENANT_ID"]
-CLIENT_ID = os.environ["CLIENT_ID"]
-CLIENT_SECRET = os.environ["CLIENT_SECRET"]
-OUTLOOK_USER_EMAIL = [u.strip() for u in os.environ["OUTLOOK_USER_EMAIL"].split(",") if u.strip()]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.load import events_with_load
+from common.snapshot import LOCAL_TZ, load_snapshot
+from common.store import EVENTS_STORE, month_key, months_spanning, write_partitions
 
 # --- Config ---
 OUTPUT_DIR = "./data"
 EVENTS_FILE = os.path.join(OUTPUT_DIR, "outlook_events.csv")
-
-LOCAL_TZ = pytz.timezone("Africa/Johannesburg")
-
-# --- Auth ---
-def get_access_token():
-    url = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
-    data = {
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "scope": "https://graph.microsoft.com/.default",
-        "grant_type": "client_credentials",
-    }
-    r = requests.post(url, data=data)
-    r.raise_for_status()
-    return r.json()["access_token"]
-
-# --- Fetch events ---
-def fetch_events(token, user_email, start_dt, end_dt):
-    url = f"https://graph.microsoft.com/v1.0/users/{user_email}/calendarView"
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {
-        "startDateTime": start_dt.isoformat(),
-        "endDateTime": end_dt.isoformat(),
-        "$top": 1000,
-    }
-
-    events = []
-    while url:
-        r = requests.get(url, headers=headers, params=params)
-        r.raise_for_status()
-        data = r.json()
-        events.extend(data.get("value", []))
-        url = data.get("@odata.nextLink")
-        params = None
-
-    return events
-
-# --- Normalize event ---
-def parse_event(ev):
-    start_dt = datetime.fromisoformat(ev["start"]["dateTime"]).astimezone(LOCAL_TZ)
-    end_dt   = datetime.fromisoformat(ev["end"]["dateTime"]).astimezone(LOCAL_TZ)
-
-    # Skip events with zero or negative duration
-    if end_dt <= start_dt:
-        return None
-
-    return {
-        "date": start_dt.date(),
-        "start_dt": start_dt,
-        "end_dt": end_dt,
-        "subject": ev.get("subject", "") or ""
-    }
+LOAD_FILE = os.path.join(OUTPUT_DIR, "outlook_daily_load.csv")
+
+# --- Outputs ---
+def write_outputs(events, window):
+    # Event rows carry their user-day's load so downstream readers don't need the join
+    events, load = events_with_load(events)
+    events.to_csv(EVENTS_FILE, index=False, encoding="utf-8")
+    load.to_csv(LOAD_FILE, index=False, encoding="utf-8")
+    write_event_store(events, window)
+
+def write_event_store(events, window, path=EVENTS_STORE):
+    # Every month the window touches is rewritten whole. An event that started before
+    # the 1st already sits in that earlier month, written by the runs that covered it
+    start_dt, end_dt = window
+    months = months_spanning(start_dt.date(), (end_dt - timedelta(days=1)).date())
+    events = events[month_key(events["date"]).isin(months)]
+
+    # Typed columns: local timestamps, dates, and dictionary-encoded subjects
+    events = events.assign(
+        start_dt=pd.to_datetime(events["start_dt"], utc=True).dt.tz_convert(LOCAL_TZ),
+        end_dt=pd.to_datetime(events["end_dt"], utc=True).dt.tz_convert(LOCAL_TZ),
+        subject=events["subject"].astype("category"),
+    )
+    write_partitions(events, path, time_column="date", user_column="user_email", months=months)
 
 # --- Main ---
 def main():
-
-    token = get_access_token()
-
-    start_dt = datetime.now(LOCAL_TZ).replace(day=1)
-    end_dt   = start_dt + timedelta(days=92)
-
-    event_rows = []
-
-    for user in OUTLOOK_USER_EMAIL:
-            raw_events = fetch_events(token, user, start_dt, end_dt)
-            parsed_events = [ev for ev in (parse_event(e) for e in raw_events) if ev is not None]
-
-            # --- Build per-user, per-day aggregation for load percentage ---
-            daily_durations = {}
-            for ev in parsed_events:
-                date = ev["date"]
-                duration = (ev["end_dt"] - ev["start_dt"]).total_seconds() / 60  # minutes
-                daily_durations[date] = daily_durations.get(date, 0) + duration
-
-            # Define total available minutes per day (8:00–16:30)
-            WORK_START = time(8, 0)
-            WORK_END   = time(16, 30)
-            TOTAL_MINUTES = ((datetime.combine(datetime.today(), WORK_END) -
-                            datetime.combine(datetime.today(), WORK_START)).total_seconds() / 60)
-
-            for ev in parsed_events:
-                date = ev["date"]
-                load_pct = min(round(daily_durations[date] / TOTAL_MINUTES * 100), 100)
-                event_rows.append([
-                    user,
-                    date.isoformat(),
-                    ev["start_dt"],
-                    ev["end_dt"],
-                    ev["subject"],
-                    load_pct
-                ])
-
-    # --- WRITE EVENTS CSV ---
-    with open(EVENTS_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["user_email", "date", "start_dt", "end_dt", "subject", "load_pct"])
-        writer.writerows(event_rows)
+    snapshot = load_snapshot()
+    # From midnight on the 1st of the snapshot's month, as the CSV always covered
+    window = snapshot.month_window()
+    write_outputs(snapshot.events_frame(snapshot.users, *window), window)
 
     print(f"Events written to: {EVENTS_FILE}")
+    print(f"Daily load written to: {LOAD_FILE}")
+    print(f"Event store written to: {EVENTS_STORE}")
 
 # --- Run ---
 if __name__ == "__main__":
@@ -10,10 +10,16 @@ by the Outlook pull stage and transforms it into the two Snowflake fact tables:
 Then loads both directly into Snowflake via the connector.
 
 Run:
-    python pipeline_transform_load.py --input output.csv
+    python pipeline_transform_load.py [--input output.csv | data/store/calendar_events] [--months 2026-10,2026-11]
+
+Without --input the events are read from the latest extraction snapshot
+(scripts/extract_snapshot.py) instead of a CSV. An --input directory is read
+as the Parquet event store written by outlook_to_csv.py, loading only the
+columns below and, with --months, only those month partitions.
 """
 
 import os
+import sys
 import argparse
 from datetime import date
 import snowflake.connector
@@ -25,7 +31,13 @@ from snowflake.connector.pandas_tools import write_pandas
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.load import events_with_load
+from common.snapshot import load_snapshot
+from common.store import read_partitions
+
 MAX_MEETING_MINS = 480
+RAW_COLUMNS = ["user_email", "date", "start_dt", "end_dt", "subject", "load_pct"]
 
 
 # NAME NORMALISATION
@@ -41,13 +53,30 @@ def email_to_fullname(email: str) -> str:
     return " ".join(p.title() for p in parts) if len(parts) > 1 else local.title()
 
 
-def read_raw(path: str) -> pd.DataFrame:
+def read_raw(path: str, months: list[str] | None = None) -> pd.DataFrame:
+    if os.path.isdir(path):
+        df = read_partitions(path, columns=RAW_COLUMNS, months=months)
+        # clean() labels and rewrites these, which categorical columns don't allow
+        df = df.astype({"user_email": "object", "subject": "object"})
+        # Blank subjects come back missing from the CSV, which clean() labels as private
+        df["subject"] = df["subject"].replace("", None)
+        return df
+
     df = pd.read_csv(path, sep=",", engine="python")
     # Drop any phantom columns from trailing delimiters
     df = df.loc[:, ~df.columns.str.startswith("Unnamed")]
     return df
 
 
+def read_snapshot() -> pd.DataFrame:
+    # Same rows outlook_to_csv.py writes, built from the snapshot without the CSV round trip
+    snapshot = load_snapshot()
+    df = events_with_load(snapshot.events_frame(snapshot.users, *snapshot.month_window()))[0]
+    # Blank subjects come back missing from the CSV, which clean() labels as private
+    df["subject"] = df["subject"].replace("", None)
+    return df
+
+
 def clean(df: pd.DataFrame) -> pd.DataFrame:
 
     # Normalise email and derive full_name
@@ -82,7 +111,17 @@ def clean(df: pd.DataFrame) -> pd.DataFrame:
     # load_pct arrives as integer percentage (e.g. 72) from outlook_to_csv.py
     # do NOT multiply by 100 — it is already in percentage form
     df["load_pct"]    = df["load_pct"].astype(float).clip(upper=100)
-    df["has_overlap"] = df["load_pct"] >= 100
+
+    # load_pct is the union of the day's meetings, so it can't show overlaps; a
+    # user-day has one when a meeting starts before an earlier one has ended
+    ordered = (
+        df.drop_duplicates(subset=["user_email", "start_time", "end_time", "meeting_subject"])
+        .sort_values(["user_email", "date", "start_time"])
+    )
+    keys  = [ordered["user_email"], ordered["date"]]
+    reach = ordered.groupby(keys)["end_time"].cummax().groupby(keys).shift()
+    overlap_days = pd.MultiIndex.from_frame(ordered.loc[ordered["start_time"] < reach, ["user_email", "date"]])
+    df["has_overlap"] = pd.MultiIndex.from_frame(df[["user_email", "date"]]).isin(overlap_days)
 
     # Calendar helpers
     df["day_of_week"] = df["date"].dt.day_name()
@@ -201,9 +240,9 @@ def load_to_snowflake(meetings: pd.DataFrame, daily: pd.DataFrame):
     conn.close()
 
 
-def run(input_path: str):
+def run(input_path: str | None = None, months: list[str] | None = None):
 
-    raw      = read_raw(input_path)
+    raw      = read_raw(input_path, months) if input_path else read_snapshot()
     cleaned  = clean(raw)
     meetings = build_meetings(cleaned)
     daily    = build_daily(meetings, cleaned)
@@ -213,7 +252,8 @@ def run(input_path: str):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input",   required=True)
+    parser.add_argument("--input",   help="events CSV or event store directory; defaults to the latest extraction snapshot")
+    parser.add_argument("--months",  help="comma-separated YYYY-MM partitions to read from an event store")
     args = parser.parse_args()
-    run(args.input)
+    run(args.input, [m.strip() for m in args.months.split(",") if m.strip()] if args.months else None)
     print("Snowflake tables updated")
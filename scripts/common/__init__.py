@@ -0,0 +1,6 @@
+"""
+Shared helpers for the schedule, report and chatbot pipeline scripts.
+
+The scripts are run directly (``python scripts/<folder>/<script>.py``), so
+each one puts ``scripts/`` on ``sys.path`` before importing from here.
+"""
@@ -0,0 +1,129 @@
+"""
+availability.py
+Team availability as bitmasks: one uint64 per user-day with bit i set when
+half-hour slot i (i * 30 minutes after midnight) is busy.
+
+OR-ing the masks of a group of users gives their combined busy time for every
+day in one vectorized step, and shifted ANDs find runs of consecutive free
+slots, so "when are these people all free for an hour?" never touches an
+individual event.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+SLOT_MINUTES  = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY      = np.uint64((1 << SLOTS_PER_DAY) - 1)
+
+
+class FreeWindow(NamedTuple):
+    date:  date
+    start: time
+    end:   time
+
+
+def _slot_of(t: time) -> int:
+    return (t.hour * 60 + t.minute) // SLOT_MINUTES
+
+
+def _slot_time(slot: int) -> time:
+    minutes = slot * SLOT_MINUTES
+    return time(23, 59, 59) if minutes >= 24 * 60 else time(minutes // 60, minutes % 60)
+
+
+def slot_mask(start: time, end: time | None = None) -> np.uint64:
+    """Bits for every slot overlapping [start, end); `end=None` means midnight."""
+    lo = _slot_of(start)
+    if end is None:
+        hi = SLOTS_PER_DAY
+    else:
+        minutes = end.hour * 60 + end.minute + (end.second > 0 or end.microsecond > 0)
+        hi = -(-minutes // SLOT_MINUTES)
+    return np.uint64(((1 << hi) - 1) ^ ((1 << lo) - 1)) if hi > lo else np.uint64(0)
+
+
+class AvailabilityModel:
+    def __init__(self, users: list[str], days: list[date]):
+        self.users = list(users)
+        self.days  = list(days)
+        self.busy  = np.zeros((len(self.users), len(self.days)), dtype=np.uint64)
+
+        self._user_index = {u: i for i, u in enumerate(self.users)}
+        self._day_index  = {d: i for i, d in enumerate(self.days)}
+
+    @classmethod
+    def from_events(
+        cls,
+        events_by_user: dict[str, Iterable[tuple[datetime, datetime]]],
+        days: list[date],
+    ) -> AvailabilityModel:
+        model = cls(list(events_by_user), days)
+        for user, intervals in events_by_user.items():
+            for start, end in intervals:
+                model.add_busy(user, start, end)
+        return model
+
+    def add_busy(self, user: str, start: datetime, end: datetime) -> None:
+        """Marks [start, end) busy, split across midnights; days outside the model are ignored."""
+        u = self._user_index[user]
+        day = start.date()
+        while day <= end.date():
+            d = self._day_index.get(day)
+            if d is not None:
+                lo = start.time() if day == start.date() else time(0, 0)
+                hi = end.time() if day == end.date() else None
+                self.busy[u, d] |= slot_mask(lo, hi)
+            day += timedelta(days=1)
+
+    def busy_mask(self, users: Iterable[str]) -> np.ndarray:
+        """Per-day mask of slots where at least one of `users` is busy."""
+        idx = [self._user_index[u] for u in users]
+        return np.bitwise_or.reduce(self.busy[idx], axis=0) if idx else np.zeros(len(self.days), dtype=np.uint64)
+
+    def free_mask(self, users: Iterable[str], work_start: time, work_end: time) -> np.ndarray:
+        """Per-day mask of working-hours slots where every one of `users` is free."""
+        return ~self.busy_mask(users) & FULL_DAY & slot_mask(work_start, work_end)
+
+    def common_free_windows(
+        self,
+        users: Iterable[str],
+        minutes: int,
+        work_start: time,
+        work_end: time,
+        limit: int | None = None,
+    ) -> list[FreeWindow]:
+        """
+        The first `limit` maximal windows (earliest first) of at least `minutes`
+        where all `users` are free inside working hours.
+        """
+        free = self.free_mask(users, work_start, work_end)
+        need = max(1, -(-minutes // SLOT_MINUTES))
+
+        # Bit i of `runs` survives when slots i .. i+need-1 are all free; the
+        # shift doubles each round so this takes log2(need) ANDs
+        runs, span = free.copy(), 1
+        while span < need:
+            step = min(span, need - span)
+            runs &= runs >> np.uint64(step)
+            span += step
+
+        # Keep only the first slot of each maximal free run
+        starts = runs & ~(free << np.uint64(1))
+
+        windows = []
+        for d in np.flatnonzero(starts):
+            day_free, day_starts = int(free[d]), int(starts[d])
+            while day_starts:
+                lo = (day_starts & -day_starts).bit_length() - 1
+                run = day_free >> lo
+                hi = lo + ((run ^ (run + 1)) >> 1).bit_length()
+                windows.append(FreeWindow(self.days[d], _slot_time(lo), _slot_time(hi)))
+                if limit is not None and len(windows) >= limit:
+                    return windows
+                day_starts &= day_starts - 1
+        return windows
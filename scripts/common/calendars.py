@@ -0,0 +1,161 @@
+"""
+calendars.py
+Outlook calendar extraction for a set of users over one window: a full
+calendarView read or an incremental calendarView delta sync.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Any, Iterator
+from urllib.parse import urlencode
+
+from .graph import CALENDAR_SELECT, GRAPH_API, CalendarEvent, batch_get, compact_event, iter_calendar_events
+from .http_client import http
+from .state import read_json, state_path
+
+# Per-user deltaLinks and the event store they keep in step (incremental mode)
+DELTA_STATE_FILE = state_path("outlook_calendar_delta.json")
+# calendarView/delta ignores $top; page size is requested via the Prefer header instead
+DELTA_PAGE_SIZE = 500
+
+
+# ---------------------------------------------------------------------------
+# Full read
+# ---------------------------------------------------------------------------
+
+def calendar_view_path(user_email: str, start_dt: datetime, end_dt: datetime) -> str:
+    params = {
+        "startDateTime": start_dt.isoformat(),
+        "endDateTime":   end_dt.isoformat(),
+        "$top":          1000,
+        "$select":       CALENDAR_SELECT,
+    }
+    return f"/users/{user_email}/calendarView?{urlencode(params)}"
+
+
+def fetch_first_pages(token: str, users: list[str], start_dt: datetime, end_dt: datetime) -> dict[str, dict[str, Any]]:
+    """First calendarView page of every user, packed 20 users per Graph $batch call."""
+    responses = batch_get(token, {u: calendar_view_path(u, start_dt, end_dt) for u in users})
+    pages = {}
+    for user, (status, body) in responses.items():
+        if status >= 400:
+            raise RuntimeError(f"calendarView failed for {user}: {status} {body.get('error', body)}")
+        pages[user] = body
+    return pages
+
+
+def fetch_events(
+    token: str,
+    user_email: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    first_page: dict[str, Any] | None = None,
+) -> Iterator[CalendarEvent]:
+    # nextLink pages can't be batched ahead of time, so they're followed one by one
+    url = GRAPH_API + calendar_view_path(user_email, start_dt, end_dt)
+    return iter_calendar_events(token, url, first_page)
+
+
+def fetch_calendars(
+    token: str,
+    users: list[str],
+    start_dt: datetime,
+    end_dt: datetime,
+    pool: Executor,
+) -> dict[str, list[CalendarEvent]]:
+    """Every user's events in the window; first pages batched, the rest paged in parallel."""
+    first_pages = fetch_first_pages(token, users, start_dt, end_dt)
+    events = pool.map(lambda u: list(fetch_events(token, u, start_dt, end_dt, first_pages[u])), users)
+    return dict(zip(users, events))
+
+
+# ---------------------------------------------------------------------------
+# Incremental (delta) sync
+# ---------------------------------------------------------------------------
+
+def calendar_delta_path(user_email: str, start_dt: datetime, end_dt: datetime) -> str:
+    params = {"startDateTime": start_dt.isoformat(), "endDateTime": end_dt.isoformat()}
+    return f"/users/{user_email}/calendarView/delta?{urlencode(params)}"
+
+
+def apply_delta_pages(token: str, store: dict[str, CalendarEvent], page: dict[str, Any]) -> str:
+    """Applies a user's delta pages to `store` (event id -> CalendarEvent) and returns the new deltaLink."""
+    headers = {"Authorization": f"Bearer {token}", "Prefer": f"odata.maxpagesize={DELTA_PAGE_SIZE}"}
+    while True:
+        for ev in page.get("value", []):
+            if "@removed" in ev:
+                store.pop(ev["id"], None)
+            else:
+                store[ev["id"]] = compact_event(ev)
+
+        if "@odata.deltaLink" in page:
+            return page["@odata.deltaLink"]
+
+        r = http.get(page["@odata.nextLink"], headers=headers)
+        r.raise_for_status()
+        page = r.json()
+
+
+def _fetch_delta_first_pages(token: str, paths: dict[str, str]) -> dict[str, tuple[int, dict[str, Any]]]:
+    responses = batch_get(token, paths, headers={"Prefer": f"odata.maxpagesize={DELTA_PAGE_SIZE}"})
+    return {user: responses[user] for user in paths}
+
+
+def sync_calendars(
+    token: str,
+    users: list[str],
+    start_dt: datetime,
+    end_dt: datetime,
+    pool: Executor,
+    state_file: str = DELTA_STATE_FILE,
+) -> dict[str, dict[str, Any]]:
+    """
+    Brings every user's stored events up to date with one calendarView delta
+    round and returns the new state, to be written back to `state_file` once
+    the caller has used it. Users without a usable deltaLink (new, different
+    window, or the token expired with 410 Gone) are synced from scratch.
+    """
+    window = [start_dt.isoformat(), end_dt.isoformat()]
+    state  = read_json(state_file, {})
+
+    entries, paths = {}, {}
+    for user in users:
+        entry = state.get(user)
+        if entry and entry.get("window") == window and entry.get("delta_link"):
+            entries[user] = {**entry, "events": {k: CalendarEvent(*v) for k, v in entry["events"].items()}}
+            paths[user]   = entry["delta_link"].removeprefix(GRAPH_API)
+        else:
+            entries[user] = {"window": window, "delta_link": None, "events": {}}
+            paths[user]   = calendar_delta_path(user, start_dt, end_dt)
+
+    first_pages = _fetch_delta_first_pages(token, paths)
+
+    expired = [u for u, (status, _) in first_pages.items() if status == 410 and entries[u]["delta_link"]]
+    if expired:
+        print(f"Delta tokens expired for {len(expired)} user(s); resyncing them from scratch")
+        for user in expired:
+            entries[user] = {"window": window, "delta_link": None, "events": {}}
+        first_pages.update(_fetch_delta_first_pages(
+            token, {u: calendar_delta_path(u, start_dt, end_dt) for u in expired}))
+
+    for user, (status, body) in first_pages.items():
+        if status >= 400:
+            raise RuntimeError(f"calendarView delta failed for {user}: {status} {body.get('error', body)}")
+
+    def sync(user):
+        before = len(entries[user]["events"])
+        entries[user]["delta_link"] = apply_delta_pages(token, entries[user]["events"], first_pages[user][1])
+        return len(entries[user]["events"]) - before
+
+    for user, net in zip(users, pool.map(sync, users)):
+        print(f"[delta] {user}: {len(entries[user]['events'])} events ({net:+d})")
+
+    return entries
+
+
+def clear_delta_state(state_file: str = DELTA_STATE_FILE) -> None:
+    if os.path.exists(state_file):
+        os.remove(state_file)
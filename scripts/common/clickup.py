@@ -0,0 +1,315 @@
+"""
+clickup.py
+Shared ClickUp API access for the schedule and report scripts.
+
+Walks the space → folder → list → task hierarchy on a bounded thread pool.
+Every request draws from one token bucket, so a concurrent crawl stays inside
+ClickUp's per-minute request budget instead of tripping a storm of 429s.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+from urllib.parse import urlencode
+
+from .http_client import http
+from .response_cache import CACHE_DIR, CACHE_TTL_HOURS, ResponseCache
+
+CLICKUP_API = "https://api.clickup.com/api/v2"
+
+# ClickUp returns at most this many tasks per /list/{id}/task page
+TASK_PAGE_SIZE = 100
+
+# ClickUp allows 100 requests/minute per token on Free, Unlimited and Business
+# plans (1,000 on Business Plus, 10,000 on Enterprise)
+RATE_LIMIT_PER_MINUTE = int(os.getenv("CLICKUP_RATE_LIMIT", "100"))
+MAX_WORKERS = int(os.getenv("CLICKUP_MAX_WORKERS", "8"))
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `acquire()` blocks until one request may be sent.
+    The bucket refills at `rate_per_minute` and holds at most `burst` tokens.
+    """
+
+    def __init__(self, rate_per_minute: int, burst: int | None = None):
+        self.rate     = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, rate_per_minute // 10))
+        self.tokens   = self.capacity
+        self.updated  = time.monotonic()
+        self.lock     = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now > self.updated:
+                    self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (self.updated - now) + (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Empty the bucket and hold every caller back for `seconds` (used after a 429)."""
+        with self.lock:
+            self.tokens  = 0.0
+            self.updated = max(self.updated, time.monotonic() + seconds)
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class ClickUpClient:
+    def __init__(
+        self,
+        token: str,
+        rate_per_minute: int = RATE_LIMIT_PER_MINUTE,
+        max_workers: int = MAX_WORKERS,
+        raise_errors: bool = False,
+        use_cache: bool = True,
+    ):
+        self.max_workers  = max(1, max_workers)
+        self.raise_errors = raise_errors
+        self.limiter      = TokenBucket(rate_per_minute)
+        self.headers      = {"Authorization": token}
+
+        self._inherited_due: dict[str, str | None] = {}
+
+        # Workspace structure changes rarely, so hierarchy lookups are cached on
+        # disk (CLICKUP_CACHE_TTL_HOURS=0 disables, CLICKUP_CACHE_REFRESH=1 clears),
+        # one subdirectory per token so workspaces sharing a runner never mix
+        token_dir  = os.path.join(CACHE_DIR, hashlib.sha1(token.encode()).hexdigest()[:12])
+        self.cache = ResponseCache(token_dir) if use_cache and CACHE_TTL_HOURS > 0 else None
+        if self.cache and os.getenv("CLICKUP_CACHE_REFRESH"):
+            self.invalidate_hierarchy()
+
+    def get(self, path: str, params: dict[str, Any] | None = None, cached: bool = False) -> dict[str, Any]:
+        cache   = self.cache if cached else None
+        key     = f"{path}?{urlencode(sorted((params or {}).items()))}"
+        entry   = cache.get(key) if cache else None
+        headers = self.headers
+        if entry:
+            if cache.is_fresh(entry):
+                return entry["body"]
+            headers = {**headers, **cache.validators(entry)}
+
+        self.limiter.acquire()
+        # A 429 drains the shared bucket so every worker waits out the reset, not just this one
+        r = http.get(f"{CLICKUP_API}/{path}", headers=headers, params=params, on_throttle=self.limiter.pause)
+
+        if entry and r.status_code == 304:
+            cache.touch(key, entry)
+            return entry["body"]
+        if self.raise_errors:
+            r.raise_for_status()
+        # Otherwise a failed lookup reads as "nothing there", as the scripts always have
+        if not r.ok:
+            return {}
+
+        body = r.json()
+        if cache:
+            cache.put(key, body, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        return body
+
+    # --- Hierarchy ---
+    def get_folders(self, space_id: str) -> list[dict[str, Any]]:
+        return self.get(f"space/{space_id}/folder", cached=True).get("folders", [])
+
+    def get_lists_in_folder(self, folder_id: str) -> list[dict[str, Any]]:
+        return self.get(f"folder/{folder_id}/list", cached=True).get("lists", [])
+
+    def get_lists_directly_in_space(self, space_id: str) -> list[dict[str, Any]]:
+        return self.get(f"space/{space_id}/list", cached=True).get("lists", [])
+
+    def invalidate_hierarchy(self) -> None:
+        """Forget cached folders and lists, e.g. right after restructuring the workspace."""
+        if self.cache:
+            for prefix in ("team?", "space/", "folder/"):
+                self.cache.invalidate(prefix)
+
+    # --- Tasks ---
+    def _get_task_page(
+        self,
+        path: str,
+        page: int,
+        params: dict[str, Any] | None,
+    ) -> tuple[list[dict[str, Any]], bool]:
+        data  = self.get(path, {"subtasks": "true", **(params or {}), "page": page})
+        tasks = data.get("tasks", [])
+        return tasks, not data.get("last_page", len(tasks) < TASK_PAGE_SIZE)
+
+    def _iter_task_pages(
+        self,
+        path: str,
+        params: dict[str, Any] | None,
+        first_page: Future | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            page    = 0
+            pending = first_page or prefetch.submit(self._get_task_page, path, 0, params)
+            while pending is not None:
+                tasks, more = pending.result()
+                page   += 1
+                pending = prefetch.submit(self._get_task_page, path, page, params) if more else None
+                yield from tasks
+
+    def get_task_page(
+        self,
+        list_id: str,
+        page: int = 0,
+        params: dict[str, Any] | None = None,
+    ) -> tuple[list[dict[str, Any]], bool]:
+        """One page of a list's tasks (subtasks included) and whether more pages follow."""
+        return self._get_task_page(f"list/{list_id}/task", page, params)
+
+    def iter_tasks(
+        self,
+        list_id: str,
+        params: dict[str, Any] | None = None,
+        first_page: Future | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yields every task of a list, page by page. The next page is requested
+        while the current one is being consumed, and only one page is held at
+        a time. `first_page` lets a caller hand over an already-started page 0.
+        """
+        return self._iter_task_pages(f"list/{list_id}/task", params, first_page)
+
+    # --- Workspace-level filtered search ---
+    def get_team_id(self) -> str:
+        """CLICKUP_TEAM_ID if set, otherwise the first workspace the token can see."""
+        return os.getenv("CLICKUP_TEAM_ID") or self.get("team", cached=True)["teams"][0]["id"]
+
+    def iter_filtered_tasks(
+        self,
+        space_ids: list[str],
+        statuses: Iterable[str],
+        params: dict[str, Any] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Streams only the tasks (subtasks included) in `space_ids` whose status
+        is one of `statuses`, using the workspace-level /team/{id}/task search
+        so the filtering happens server-side. Extra ClickUp filters such as
+        `assignees[]` or `due_date_lt` can be passed through `params`.
+        """
+        filters = {
+            "space_ids[]": list(space_ids),
+            "statuses[]":  sorted(s.lower() for s in statuses),
+            **(params or {}),
+        }
+        return self._iter_task_pages(f"team/{self.get_team_id()}/task", filters)
+
+    def inherited_due_date(self, task_id: str) -> str | None:
+        """
+        due_date (epoch ms) of a task or, failing that, of its nearest ancestor.
+        Filtered searches can leave out a subtask's parent; this recovers the
+        due date the subtask would have inherited. Memoised per client.
+        """
+        if task_id not in self._inherited_due:
+            task = self.get(f"task/{task_id}")
+            due  = task.get("due_date")
+            if not due and task.get("parent"):
+                due = self.inherited_due_date(task["parent"])
+            self._inherited_due[task_id] = due
+        return self._inherited_due[task_id]
+
+    # --- Concurrent crawl ---
+    def crawl_lists(self, space_ids: list[str]) -> list[dict[str, Any]]:
+        """
+        Every list in `space_ids`, fetched concurrently but returned in the
+        same order as a serial walk: per space, folder lists then folderless lists.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            folders = [pool.submit(self.get_folders, s) for s in space_ids]
+            direct  = [pool.submit(self.get_lists_directly_in_space, s) for s in space_ids]
+
+            folder_lists = [
+                [pool.submit(self.get_lists_in_folder, f["id"]) for f in fut.result()]
+                for fut in folders
+            ]
+
+            lists = []
+            for per_folder, space_lists in zip(folder_lists, direct):
+                for fut in per_folder:
+                    lists.extend(fut.result())
+                lists.extend(space_lists.result())
+        return lists
+
+    def crawl_tasks(self, space_ids: list[str]) -> Iterator[tuple[dict[str, Any], Iterator[dict[str, Any]]]]:
+        """
+        (list, task stream) for every list in `space_ids`, in serial-walk order.
+        Page 0 is requested concurrently for a window of `max_workers` lists
+        ahead of the one being consumed, and the next list's page 0 is started
+        as each one is handed out, so memory stays flat however many lists the
+        workspace has. Later pages stream in through `iter_tasks`.
+        """
+        lists = iter(self.crawl_lists(space_ids))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            ahead = deque((lst, pool.submit(self.get_task_page, lst["id"])) for lst in islice(lists, self.max_workers))
+            while ahead:
+                lst, first_page = ahead.popleft()
+                upcoming = next(lists, None)
+                if upcoming is not None:
+                    ahead.append((upcoming, pool.submit(self.get_task_page, upcoming["id"])))
+                yield lst, self.iter_tasks(lst["id"], first_page=first_page)
+
+
+# ---------------------------------------------------------------------------
+# Task tree
+# ---------------------------------------------------------------------------
+
+def walk_task_tree(
+    tasks: Iterable[dict[str, Any]],
+    visit: Callable[[dict[str, Any], bool, Any], Any],
+    orphan_ctx: Callable[[str], Any] | None = None,
+) -> None:
+    """
+    Calls `visit(task, is_sub, parent_ctx)` on every task of a flat
+    `subtasks=true` listing, parents before their subtasks. Each subtask
+    receives whatever its parent's `visit` returned as `parent_ctx`.
+
+    Subtasks are matched to parents through each task's `parent` field, so
+    the walk costs no requests. `tasks` may be a stream: a subtask that
+    arrives before its parent is held back until the parent is visited.
+    Subtasks whose parent never shows up are visited as top-level tasks, or,
+    when `orphan_ctx` is given, as subtasks with `orphan_ctx(parent_id)` as
+    their parent ctx (for filtered listings that leave parents out).
+    """
+    ctx_of  = {}                 # visited task id -> ctx for its subtasks
+    waiting = defaultdict(list)  # parent id -> subtasks seen before the parent
+
+    def walk(task, is_sub, parent_ctx):
+        ctx = visit(task, is_sub, parent_ctx)
+        ctx_of[task.get("id")] = ctx
+        for sub in waiting.pop(task.get("id"), []):
+            walk(sub, True, ctx)
+
+    for t in tasks:
+        parent = t.get("parent")
+        if parent is None:
+            walk(t, False, None)
+        elif parent in ctx_of:
+            walk(t, True, ctx_of[parent])
+        else:
+            waiting[parent].append(t)
+
+    while waiting:
+        parent, orphans = waiting.popitem()
+        ctx = orphan_ctx(parent) if orphan_ctx else None
+        for t in orphans:
+            walk(t, orphan_ctx is not None, ctx)
@@ -0,0 +1,255 @@
+"""
+graph.py
+Microsoft Graph access shared by the Outlook extraction scripts.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterator, NamedTuple
+
+from .http_client import RETRY_STATUSES, http
+from .state import read_json, write_json
+
+GRAPH_API = "https://graph.microsoft.com/v1.0"
+
+# Graph's cap on sub-requests per JSON $batch call
+BATCH_LIMIT = 20
+
+# The only event fields the calendar readers use; bodies, attendees and
+# online-meeting blobs stay on the server
+CALENDAR_SELECT = "subject,start,end,showAs"
+
+# Refresh this long before the token actually expires so in-flight calls never race it
+TOKEN_REFRESH_MARGIN = 300
+
+# Optional file that lets back-to-back steps of one job reuse a token
+TOKEN_CACHE_FILE = os.getenv("GRAPH_TOKEN_CACHE")
+
+
+# ---------------------------------------------------------------------------
+# Auth
+# ---------------------------------------------------------------------------
+
+class GraphTokenProvider:
+    """
+    Client-credentials access token, fetched once and shared by every user
+    and thread until shortly before `expires_in` runs out. With `cache_path`
+    set the token is also written to disk (owner-only) for the next step.
+    """
+
+    def __init__(self, tenant_id: str, client_id: str, client_secret: str, cache_path: str | None = TOKEN_CACHE_FILE):
+        self.tenant_id     = tenant_id
+        self.client_id     = client_id
+        self.client_secret = client_secret
+        self.cache_path    = cache_path
+
+        self._token      = None
+        self._expires_at = 0.0
+        self._lock       = threading.Lock()
+
+    def _usable(self, expires_at: float) -> bool:
+        return time.time() < expires_at - TOKEN_REFRESH_MARGIN
+
+    def token(self) -> str:
+        with self._lock:
+            if self._token and self._usable(self._expires_at):
+                return self._token
+
+            cached = read_json(self.cache_path, {}) if self.cache_path else {}
+            if (cached.get("tenant_id"), cached.get("client_id")) == (self.tenant_id, self.client_id) \
+                    and self._usable(cached.get("expires_at", 0)):
+                self._token, self._expires_at = cached["access_token"], cached["expires_at"]
+                return self._token
+
+            r = http.post(
+                f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token",
+                data={
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "scope": "https://graph.microsoft.com/.default",
+                    "grant_type": "client_credentials",
+                },
+            )
+            r.raise_for_status()
+            data = r.json()
+            self._token      = data["access_token"]
+            self._expires_at = time.time() + int(data.get("expires_in", 3599))
+
+            if self.cache_path:
+                write_json(self.cache_path, {
+                    "tenant_id":    self.tenant_id,
+                    "client_id":    self.client_id,
+                    "access_token": self._token,
+                    "expires_at":   self._expires_at,
+                }, mode=0o600)
+            return self._token
+
+
+# ---------------------------------------------------------------------------
+# JSON batching
+# ---------------------------------------------------------------------------
+
+def batch_get(
+    token: str,
+    paths: dict[str, str],
+    headers: dict[str, str] | None = None,
+) -> dict[str, tuple[int, dict[str, Any]]]:
+    """
+    GETs every `id -> relative path` (e.g. "/users/{email}/calendarView?...")
+    through Graph's JSON $batch endpoint, BATCH_LIMIT sub-requests per round
+    trip, and returns `id -> (status, body)`. Sub-requests throttled inside a
+    batch are resent in a later batch once the longest of their waits (see
+    HttpClient.retry_delay) has passed.
+    Follow-up `@odata.nextLink` pages are left to the caller.
+    """
+    results = {}
+    pending = list(paths.items())
+
+    for attempt in range(http.max_retries + 1):
+        retry, wait = [], 0.0
+        for i in range(0, len(pending), BATCH_LIMIT):
+            body = {"requests": [
+                {"id": rid, "method": "GET", "url": path, **({"headers": headers} if headers else {})}
+                for rid, path in pending[i:i + BATCH_LIMIT]
+            ]}
+            r = http.post(f"{GRAPH_API}/$batch", headers={"Authorization": f"Bearer {token}"}, json=body)
+            r.raise_for_status()
+
+            for resp in r.json().get("responses", []):
+                rid, status = resp["id"], int(resp["status"])
+                if status in RETRY_STATUSES and attempt < http.max_retries:
+                    retry.append((rid, paths[rid]))
+                    wait = max(wait, http.retry_delay(status, resp.get("headers") or {}, attempt))
+                else:
+                    results[rid] = (status, resp.get("body") or {})
+
+        if not retry:
+            break
+        pending = retry
+        time.sleep(wait)
+
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Calendar pages
+# ---------------------------------------------------------------------------
+
+class CalendarEvent(NamedTuple):
+    """One calendar event reduced to the fields in CALENDAR_SELECT."""
+    subject: str | None
+    start:   str          # Graph dateTime, in the Prefer: outlook.timezone zone (UTC by default)
+    end:     str
+    show_as: str
+
+
+def compact_event(ev: dict[str, Any]) -> CalendarEvent:
+    return CalendarEvent(ev.get("subject"), ev["start"]["dateTime"], ev["end"]["dateTime"], ev.get("showAs", "busy"))
+
+
+def iter_calendar_events(
+    token: str,
+    url: str | None = None,
+    first_page: dict[str, Any] | None = None,
+    headers: dict[str, str] | None = None,
+) -> Iterator[CalendarEvent]:
+    """
+    Yields the events of a calendarView listing starting at `url` (or at an
+    already fetched `first_page`), following @odata.nextLink. Each page is
+    reduced to CalendarEvent tuples and released before the next one is
+    requested, so only one decoded page is alive at a time.
+    """
+    headers = {"Authorization": f"Bearer {token}", **(headers or {})}
+    page = first_page
+    while True:
+        if page is None:
+            r = http.get(url, headers=headers)
+            r.raise_for_status()
+            page = r.json()
+
+        events = [compact_event(ev) for ev in page.get("value", [])]
+        url    = page.get("@odata.nextLink")
+        page   = None
+
+        yield from events
+        if not url:
+            return
+
+
+# ---------------------------------------------------------------------------
+# Free/busy (getSchedule)
+# ---------------------------------------------------------------------------
+
+# Graph caps one getSchedule call at 62 days; users are sent in groups of this size
+SCHEDULE_MAX_DAYS  = 62
+SCHEDULE_MAX_USERS = 20
+
+# availabilityView digit for an interval with nothing booked
+AVAILABILITY_FREE = "0"
+
+
+class Schedule(NamedTuple):
+    """
+    A user's free/busy over a window: one availabilityView digit per interval
+    (0 free, 1 tentative, 2 busy, 3 out of office, 4 working elsewhere) and
+    the non-free items behind them.
+    """
+    availability: str
+    items:        list[CalendarEvent]
+
+
+def get_schedules(
+    token: str,
+    users: list[str],
+    start: datetime,
+    end: datetime,
+    interval_minutes: int = 30,
+    time_zone: str = "UTC",
+) -> dict[str, Schedule]:
+    """
+    Free/busy for every user between naive local `start` and `end` (in
+    `time_zone`), via getSchedule: up to SCHEDULE_MAX_USERS users per call and
+    windows of at most SCHEDULE_MAX_DAYS, stitched back together. `start` must
+    fall on an interval boundary for the stitched view to stay aligned.
+    """
+    headers = {"Authorization": f"Bearer {token}", "Prefer": f'outlook.timezone="{time_zone}"'}
+    views   = {u: [] for u in users}
+    items   = {u: {} for u in users}
+    # scheduleId comes back in the mailbox's own casing
+    by_lower = {u.lower(): u for u in users}
+
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + timedelta(days=SCHEDULE_MAX_DAYS), end)
+        for i in range(0, len(users), SCHEDULE_MAX_USERS):
+            group = users[i:i + SCHEDULE_MAX_USERS]
+            r = http.post(
+                f"{GRAPH_API}/users/{group[0]}/calendar/getSchedule",
+                headers=headers,
+                json={
+                    "schedules": group,
+                    "startTime": {"dateTime": chunk_start.isoformat(), "timeZone": time_zone},
+                    "endTime":   {"dateTime": chunk_end.isoformat(), "timeZone": time_zone},
+                    "availabilityViewInterval": interval_minutes,
+                },
+            )
+            r.raise_for_status()
+
+            for sched in r.json().get("value", []):
+                user = by_lower[sched["scheduleId"].lower()]
+                if "error" in sched:
+                    raise RuntimeError(f"getSchedule failed for {user}: {sched['error']}")
+                views[user].append(sched.get("availabilityView", ""))
+                for it in sched.get("scheduleItems", []):
+                    if it.get("status") == "free":
+                        continue
+                    ev = CalendarEvent(it.get("subject"), it["start"]["dateTime"], it["end"]["dateTime"], it["status"])
+                    # Items crossing a chunk boundary come back in both chunks
+                    items[user][(ev.subject, ev.start, ev.end)] = ev
+        chunk_start = chunk_end
+
+    return {u: Schedule("".join(views[u]), list(items[u].values())) for u in users}
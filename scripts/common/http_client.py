@@ -0,0 +1,186 @@
+"""
+http_client.py
+One pooled HTTP layer for the ClickUp and Microsoft Graph calls.
+
+Keeps one keep-alive `requests.Session` per host, asks for compressed
+responses, applies a default timeout and retries throttled or failed calls
+with exponential backoff, honouring `Retry-After` when the server sends it.
+Every call is timed per endpoint so `latency_report()` shows where
+extraction time goes.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Mapping
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT    = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+MAX_RETRIES     = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+BACKOFF_BASE    = float(os.getenv("HTTP_BACKOFF_BASE", "1.0"))
+MAX_BACKOFF     = 60.0
+# Ceiling on a server-requested wait, so one bad header can't stall a job for hours
+MAX_RETRY_AFTER = float(os.getenv("HTTP_MAX_RETRY_AFTER", "300"))
+POOL_SIZE       = int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Path segments that carry ids / emails are folded so latency groups by endpoint;
+# version segments such as "v2" or "v1.0" have too few digits to match
+_ID_SEGMENT = re.compile(r"^(?:.*@.*|(?:\D*\d){3}.*)$")
+
+
+def endpoint_name(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    path  = "/".join("{id}" if _ID_SEGMENT.match(seg) else seg for seg in parts.path.split("/"))
+    return f"{method} {parts.netloc}{path}"
+
+
+class HttpClient:
+    def __init__(
+        self,
+        timeout: tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        pool_size: int = POOL_SIZE,
+    ):
+        self.timeout      = timeout
+        self.max_retries  = max_retries
+        self.backoff_base = backoff_base
+        self.pool_size    = pool_size
+
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        # endpoint -> [calls, total seconds, slowest seconds]
+        self._latency: dict[str, list[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+
+    # --- Connection pooling ---
+    def session(self, host: str) -> requests.Session:
+        with self._lock:
+            if host not in self._sessions:
+                s = requests.Session()
+                s.headers["Accept-Encoding"] = "gzip, deflate"
+                s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+                self._sessions[host] = s
+            return self._sessions[host]
+
+    # --- Requests ---
+    def request(
+        self,
+        method: str,
+        url: str,
+        on_throttle: Callable[[float], None] | None = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Sends one request, retrying connection errors and RETRY_STATUSES up to
+        `max_retries` times. `on_throttle(delay)` is called before sleeping on a
+        429 so a caller-side rate limiter can hold its other workers back too.
+        The last response is returned as-is; callers decide whether to raise.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        session  = self.session(urlsplit(url).netloc)
+        endpoint = endpoint_name(method, url)
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                r = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(endpoint, time.perf_counter() - started)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            self._record(endpoint, time.perf_counter() - started)
+            if r.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return r
+
+            delay = self.retry_delay(r.status_code, r.headers, attempt)
+            if r.status_code == 429 and on_throttle:
+                on_throttle(delay)
+            time.sleep(delay)
+
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    # --- Backoff ---
+    def _backoff(self, attempt: int) -> float:
+        return min(MAX_BACKOFF, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def retry_delay(self, status: int, headers: Mapping[str, str], attempt: int) -> float:
+        """
+        Seconds to wait before retrying a `status` response: what its headers
+        ask for, capped at MAX_RETRY_AFTER, else the exponential backoff. Also
+        used for throttled sub-responses of a Graph $batch.
+        """
+        delay = self._server_delay(status, CaseInsensitiveDict(headers))
+        if delay is None:
+            return self._backoff(attempt)
+        return min(delay, MAX_RETRY_AFTER)
+
+    def _server_delay(self, status: int, headers: Mapping[str, str]) -> float | None:
+        """Seconds the server asked us to wait, or None if it said nothing usable."""
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                pass
+            try:
+                return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                return None
+
+        # ClickUp signals throttling with the epoch second its budget refills
+        reset = headers.get("X-RateLimit-Reset")
+        if status == 429 and reset:
+            try:
+                return max(float(reset) - time.time(), 1.0)
+            except ValueError:
+                return None
+
+        return None
+
+    # --- Latency counters ---
+    def _record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            stats     = self._latency[endpoint]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2]  = max(stats[2], seconds)
+
+    def latency(self) -> dict[str, tuple[int, float, float]]:
+        """endpoint -> (calls, total seconds, slowest seconds)"""
+        with self._lock:
+            return {k: (int(v[0]), v[1], v[2]) for k, v in self._latency.items()}
+
+    def latency_report(self) -> str:
+        rows = sorted(self.latency().items(), key=lambda kv: kv[1][1], reverse=True)
+        lines = [f"{'endpoint':<70} {'calls':>6} {'total s':>8} {'avg ms':>8} {'max ms':>8}"]
+        for endpoint, (calls, total, slowest) in rows:
+            lines.append(
+                f"{endpoint:<70} {calls:>6} {total:>8.1f} {total / calls * 1000:>8.0f} {slowest * 1000:>8.0f}"
+            )
+        return "\n".join(lines)
+
+
+# Shared by every script in the process so connections are reused across modules
+http = HttpClient()
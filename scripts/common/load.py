@@ -0,0 +1,72 @@
+"""
+load.py
+Per user-day calendar load for the Schedule ETL: the union of a day's events
+clipped to the working window, so overlapping meetings count once.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, time
+
+import pandas as pd
+
+# Working day the load percentage is measured against (8:00–16:30)
+WORK_START = time(8, 0)
+WORK_END   = time(16, 30)
+
+EVENT_COLUMNS = ["user_email", "date", "start_dt", "end_dt", "subject"]
+LOAD_COLUMNS  = ["user_email", "date", "busy_minutes", "load_pct"]
+
+
+def work_minutes(work_start: time = WORK_START, work_end: time = WORK_END) -> float:
+    return (datetime.combine(datetime.today(), work_end) -
+            datetime.combine(datetime.today(), work_start)).total_seconds() / 60
+
+
+def daily_load(events: pd.DataFrame, work_start: time = WORK_START, work_end: time = WORK_END) -> pd.DataFrame:
+    """
+    Busy minutes and load % per user-day of `events` (EVENT_COLUMNS, tz-aware
+    start_dt / end_dt): events are clipped to work_start–work_end on their
+    start date and merged into their union before summing.
+    """
+    if events.empty:
+        return pd.DataFrame(columns=LOAD_COLUMNS)
+
+    day = events["start_dt"].dt.normalize()
+    lo_bound = day + pd.Timedelta(hours=work_start.hour, minutes=work_start.minute)
+    hi_bound = day + pd.Timedelta(hours=work_end.hour, minutes=work_end.minute)
+
+    clipped = pd.DataFrame({
+        "user_email": events["user_email"],
+        "date":       events["date"],
+        "lo":         events["start_dt"].where(events["start_dt"] > lo_bound, lo_bound),
+        "hi":         events["end_dt"].where(events["end_dt"] < hi_bound, hi_bound),
+    })
+    clipped = clipped[clipped["hi"] > clipped["lo"]].sort_values(["user_email", "date", "lo"])
+
+    # A new block starts wherever an event begins after everything before it in
+    # the same user-day has ended
+    keys   = [clipped["user_email"], clipped["date"]]
+    reach  = clipped.groupby(keys)["hi"].cummax().groupby(keys).shift()
+    block  = (reach.isna() | (clipped["lo"] > reach)).cumsum()
+    blocks = clipped.groupby(block).agg(
+        user_email=("user_email", "first"), date=("date", "first"), lo=("lo", "min"), hi=("hi", "max"),
+    )
+    blocks["busy_minutes"] = (blocks["hi"] - blocks["lo"]).dt.total_seconds() / 60
+
+    load = (
+        events[["user_email", "date"]].drop_duplicates()
+        .merge(blocks.groupby(["user_email", "date"], as_index=False)["busy_minutes"].sum(),
+               on=["user_email", "date"], how="left")
+        .fillna({"busy_minutes": 0})
+    )
+    total = work_minutes(work_start, work_end)
+    load["load_pct"] = (load["busy_minutes"] / total * 100).round().clip(upper=100).astype(int)
+    return load
+
+
+def events_with_load(events: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(event rows with their user-day's load_pct, the per user-day load table)."""
+    load = daily_load(events)
+    rows = events.merge(load[["user_email", "date", "load_pct"]], on=["user_email", "date"], how="left")
+    return rows, load
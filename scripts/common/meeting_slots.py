@@ -0,0 +1,101 @@
+"""
+meeting_slots.py
+Multi-person meeting-slot finder.
+
+Every busy interval of every requested user, plus the opening and closing of
+each working day, goes into one heap and is swept in time order while
+counting how many hard (busy / out-of-office) and tentative bookings are
+active. Stretches with no hard booking long enough for the meeting become
+candidates, so the whole search is O(E log E) in the number of events.
+"""
+
+from __future__ import annotations
+
+import heapq
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, NamedTuple
+
+# Graph showAs values that block a slot outright; "tentative" only counts as a
+# conflict and anything else ("free", "workingElsewhere") is ignored
+HARD_STATUSES = {"busy", "oof"}
+
+
+class MeetingSlot(NamedTuple):
+    start:               datetime
+    end:                 datetime
+    tentative_conflicts: int
+
+    @property
+    def duration(self) -> timedelta:
+        return self.end - self.start
+
+
+def find_meeting_slots(
+    busy: dict[str, Iterable[tuple[datetime, datetime, str]]],
+    days: list[date],
+    duration: timedelta,
+    work_start: time,
+    work_end: time,
+    limit: int | None = None,
+) -> list[MeetingSlot]:
+    """
+    Ranked windows of at least `duration` inside `work_start`-`work_end` on
+    `days` where none of the users in `busy` (user -> (start, end, showAs))
+    has a hard booking. Each such stretch is a candidate along with its fully
+    free sub-runs; they're ranked by fewest tentative bookings overlapped,
+    then earliest, then longest.
+    """
+    # (time, hard delta, tentative delta). Outside working hours counts as one
+    # extra hard booking, so the sweep starts "closed"
+    heap = []
+    for day in days:
+        heap.append((datetime.combine(day, work_start), -1, 0))
+        heap.append((datetime.combine(day, work_end), 1, 0))
+    for intervals in busy.values():
+        for start, end, show_as in intervals:
+            if end <= start:
+                continue
+            status = (show_as or "busy").lower()
+            if status in HARD_STATUSES:
+                heap += [(start, 1, 0), (end, -1, 0)]
+            elif status == "tentative":
+                heap += [(start, 0, 1), (end, 0, -1)]
+    heapq.heapify(heap)
+
+    candidates = []
+    hard, tentative = 1, 0
+    stretch_start, stretch_conflicts = None, 0
+    run_start = None
+
+    while heap:
+        t = heap[0][0]
+        new_hard, new_tentative, tentative_starts = hard, tentative, 0
+        while heap and heap[0][0] == t:
+            _, dh, dt = heapq.heappop(heap)
+            new_hard += dh
+            new_tentative += dt
+            tentative_starts += dt > 0
+
+        # Close what ends here
+        if run_start is not None and (new_hard or new_tentative):
+            if t - run_start >= duration:
+                candidates.append(MeetingSlot(run_start, t, 0))
+            run_start = None
+        if stretch_start is not None and new_hard:
+            if t - stretch_start >= duration and stretch_conflicts:
+                candidates.append(MeetingSlot(stretch_start, t, stretch_conflicts))
+            stretch_start = None
+
+        # Open or extend what continues from here
+        if not new_hard:
+            if stretch_start is None:
+                stretch_start, stretch_conflicts = t, new_tentative
+            else:
+                stretch_conflicts += tentative_starts
+            if not new_tentative and run_start is None:
+                run_start = t
+
+        hard, tentative = new_hard, new_tentative
+
+    candidates.sort(key=lambda s: (s.tentative_conflicts, s.start, -s.duration))
+    return candidates[:limit] if limit is not None else candidates
@@ -0,0 +1,71 @@
+"""
+response_cache.py
+On-disk cache for API responses that rarely change (the ClickUp
+space / folder / list hierarchy).
+
+Each entry is one JSON file holding the body, when it was stored and any
+ETag / Last-Modified validators. Fresh entries (younger than the TTL) are
+served without a request; stale ones are revalidated with a conditional
+request when the server gave us a validator, otherwise re-fetched.
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import time
+from typing import Any
+
+from .state import read_json, write_json
+
+CACHE_DIR       = os.getenv("CLICKUP_CACHE_DIR", "./data/.cache/clickup")
+CACHE_TTL_HOURS = float(os.getenv("CLICKUP_CACHE_TTL_HOURS", "168"))
+
+
+class ResponseCache:
+    def __init__(self, directory: str = CACHE_DIR, ttl_seconds: float = CACHE_TTL_HOURS * 3600):
+        self.directory   = directory
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """The stored entry for `key` (fresh or stale), or None."""
+        return read_json(self._path(key))
+
+    def is_fresh(self, entry: dict[str, Any]) -> bool:
+        return time.time() - entry["stored_at"] < self.ttl_seconds
+
+    def validators(self, entry: dict[str, Any]) -> dict[str, str]:
+        """Conditional-request headers for a stale entry, empty if the server sent none."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, key: str, body: Any, etag: str | None = None, last_modified: str | None = None) -> None:
+        write_json(self._path(key), {
+            "key":           key,
+            "stored_at":     time.time(),
+            "etag":          etag,
+            "last_modified": last_modified,
+            "body":          body,
+        })
+
+    def touch(self, key: str, entry: dict[str, Any]) -> None:
+        """Restart the TTL of an entry the server confirmed unchanged (304)."""
+        self.put(key, entry["body"], entry.get("etag"), entry.get("last_modified"))
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Drop every entry whose key starts with `prefix` (all entries by default)."""
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            entry = read_json(path, {})
+            if entry.get("key", "").startswith(prefix):
+                os.remove(path)
+                removed += 1
+        return removed
@@ -0,0 +1,137 @@
+"""
+slots.py
+Interval-to-slot occupancy and lookups for the calendar slot reports.
+
+Events are converted to integer slot ranges once and scattered into a
+users x days x slots grid with difference arrays, instead of scanning every
+user's event list for every cell. A cell counts as covered when
+`start_time <= slot < end_time`, the same test the reports always used.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import date, time
+from typing import Any, NamedTuple
+
+import numpy as np
+
+# Cell label for events without a subject, so they still read as busy
+NO_SUBJECT = "No subject"
+
+
+class Occupancy(NamedTuple):
+    counts:   np.ndarray   # (users, days, slots) number of events covering each cell
+    subjects: np.ndarray   # (users, days, slots) object array of ", "-joined subjects, "" if free
+
+
+def _micros(t: time) -> int:
+    return ((t.hour * 60 + t.minute) * 60 + t.second) * 1_000_000 + t.microsecond
+
+
+def occupancy(
+    user_events: list[list[dict[str, Any]]],
+    days: list[date],
+    slot_times: list[time],
+) -> Occupancy:
+    """
+    `user_events[u]` holds that user's events as dicts with `date`,
+    `start_time`, `end_time` and `subject`; `slot_times` must be evenly spaced.
+    Where several events share a cell their subjects are joined in list order.
+    """
+    n_users, n_days, n_slots = len(user_events), len(days), len(slot_times)
+    day_index = {d: i for i, d in enumerate(days)}
+
+    base = _micros(slot_times[0]) if n_slots else 0
+    step = _micros(slot_times[1]) - base if n_slots > 1 else 1
+
+    uu, dd, starts, ends, subjects = [], [], [], [], []
+    for u, events in enumerate(user_events):
+        for ev in events:
+            d = day_index.get(ev["date"])
+            if d is None:
+                continue
+            uu.append(u)
+            dd.append(d)
+            starts.append(_micros(ev["start_time"]))
+            ends.append(_micros(ev["end_time"]))
+            subjects.append(ev["subject"])
+
+    uu, dd = np.asarray(uu, dtype=np.intp), np.asarray(dd, dtype=np.intp)
+
+    # First covered slot is ceil((start - base) / step), first uncovered ceil((end - base) / step)
+    lo = np.clip(-((base - np.asarray(starts, dtype=np.int64)) // step), 0, n_slots)
+    hi = np.clip(-((base - np.asarray(ends, dtype=np.int64)) // step), 0, n_slots)
+    hi = np.maximum(hi, lo)
+
+    # +1 / -1 at each range's ends; the running sum along the slot axis is the count.
+    # The same trick with event ids (1-based) names the event in single-event cells
+    ids   = np.arange(1, len(subjects) + 1, dtype=np.int64)
+    count = np.zeros((n_users, n_days, n_slots + 1), dtype=np.int32)
+    idsum = np.zeros((n_users, n_days, n_slots + 1), dtype=np.int64)
+    np.add.at(count, (uu, dd, lo), 1)
+    np.add.at(count, (uu, dd, hi), -1)
+    np.add.at(idsum, (uu, dd, lo), ids)
+    np.add.at(idsum, (uu, dd, hi), -ids)
+    count = count.cumsum(axis=2)[:, :, :n_slots]
+    idsum = idsum.cumsum(axis=2)[:, :, :n_slots]
+
+    subject_of = np.empty(len(subjects), dtype=object)
+    subject_of[:] = subjects
+
+    out = np.full((n_users, n_days, n_slots), "", dtype=object)
+    single = count == 1
+    out[single] = subject_of[idsum[single] - 1]
+
+    # Overlaps are rare; join those cells the slow way, keeping list order
+    overlapping = np.argwhere(count > 1)
+    if len(overlapping):
+        by_user_day: dict[tuple[int, int], np.ndarray] = {}
+        for u, d, s in overlapping:
+            key = (u, d)
+            if key not in by_user_day:
+                by_user_day[key] = np.flatnonzero((uu == u) & (dd == d))
+            events = by_user_day[key]
+            covering = events[(lo[events] <= s) & (s < hi[events])]
+            out[u, d, s] = ", ".join(subject_of[covering])
+
+    return Occupancy(count, out)
+
+
+class EventIndex:
+    """
+    Events bucketed per (user, date) and sorted by start, so looking up the
+    events covering one slot only touches those starting within the bucket's
+    longest event before it rather than the user's whole list.
+    """
+
+    def __init__(self, all_events: dict[str, list[dict[str, Any]]]):
+        buckets: dict[tuple[str, date], list[tuple[int, int, int, dict[str, Any]]]] = {}
+        for user, events in all_events.items():
+            for seq, ev in enumerate(events):
+                start, end = _micros(ev["start_time"]), _micros(ev["end_time"])
+                # Nothing satisfies start <= slot < end for these (e.g. past midnight)
+                if end <= start:
+                    continue
+                buckets.setdefault((user, ev["date"]), []).append((start, end, seq, ev))
+
+        self._buckets = {}
+        for key, entries in buckets.items():
+            entries.sort(key=lambda e: (e[0], e[2]))
+            self._buckets[key] = (
+                [e[0] for e in entries],
+                entries,
+                max(e[1] - e[0] for e in entries),
+            )
+
+    def at(self, user: str, day: date, slot: time) -> list[dict[str, Any]]:
+        """Events with start_time <= slot < end_time, in their original list order."""
+        bucket = self._buckets.get((user, day))
+        if bucket is None:
+            return []
+        starts, entries, longest = bucket
+        t = _micros(slot)
+        lo, hi = bisect_left(starts, t - longest), bisect_right(starts, t)
+        hits = [e for e in entries[lo:hi] if t < e[1]]
+        hits.sort(key=lambda e: e[2])
+        return [e[3] for e in hits]
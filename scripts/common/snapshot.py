@@ -0,0 +1,166 @@
+"""
+snapshot.py
+The extraction snapshot every schedule output renders from.
+
+scripts/extract_snapshot.py pulls the calendars and ClickUp tasks once, over
+a window wide enough for every report, and writes them here as a versioned,
+timestamped JSON file. The workbooks, calendar_flat.csv, outlook_events.csv
+and the Snowflake load then read that file instead of calling the APIs
+themselves.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any
+
+import pandas as pd
+import pytz
+
+from .load import EVENT_COLUMNS
+from .slots import NO_SUBJECT
+from .state import read_json, write_json
+from .tasks import task_dict_for
+
+SNAPSHOT_DIR     = os.getenv("SNAPSHOT_DIR", "./data/snapshots")
+SNAPSHOT_VERSION = 1
+# Timestamped snapshots kept next to latest.json; older ones are pruned on write
+SNAPSHOT_KEEP    = int(os.getenv("SNAPSHOT_KEEP", "5"))
+
+LOCAL_TZ = pytz.timezone("Africa/Johannesburg")
+
+# Days covered from the 1st of the month: the three-month workbook and outlook_events.csv
+MONTH_SPAN_DAYS = 92
+
+
+def snapshot_window(today: date | None = None) -> tuple[datetime, datetime]:
+    """
+    [Monday on or before the 1st of this month, the 1st + MONTH_SPAN_DAYS) at
+    local midnight. It covers the current and next-week workbooks as well as
+    the month-based reports, and stays the same all month so stored
+    calendarView deltaLinks keep matching it.
+    """
+    today = today or datetime.now(LOCAL_TZ).date()
+    first = today.replace(day=1)
+    start = first - timedelta(days=first.weekday())
+    return (
+        LOCAL_TZ.localize(datetime.combine(start, time(0, 0))),
+        LOCAL_TZ.localize(datetime.combine(first + timedelta(days=MONTH_SPAN_DAYS), time(0, 0))),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Files
+# ---------------------------------------------------------------------------
+
+def _latest_path(directory: str) -> str:
+    return os.path.join(directory, "latest.json")
+
+
+def write_snapshot(data: dict[str, Any], directory: str = SNAPSHOT_DIR) -> str:
+    """Writes `data` as a new timestamped snapshot, points latest.json at it and returns its path."""
+    created = datetime.now(LOCAL_TZ)
+    path = os.path.join(directory, f"snapshot_{created.strftime('%Y%m%dT%H%M%S')}.json")
+    write_json(path, {"version": SNAPSHOT_VERSION, "created_at": created.isoformat(), **data})
+    write_json(_latest_path(directory), {"path": os.path.basename(path)})
+
+    for old in sorted(glob.glob(os.path.join(directory, "snapshot_*.json")))[:-SNAPSHOT_KEEP]:
+        os.remove(old)
+    return path
+
+
+def load_snapshot(path: str | None = None, directory: str = SNAPSHOT_DIR) -> Snapshot:
+    """The snapshot at `path`, or the latest one in `directory`."""
+    if path is None:
+        latest = read_json(_latest_path(directory))
+        path = os.path.join(directory, latest["path"]) if latest else None
+
+    data = read_json(path) if path else None
+    if data is None:
+        raise FileNotFoundError(
+            f"No extraction snapshot found in {path or directory}; run scripts/extract_snapshot.py first")
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Snapshot {path} is version {data.get('version')}, expected {SNAPSHOT_VERSION}; re-run the extraction")
+    return Snapshot(data)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class Snapshot:
+    """
+    Read-side view of one snapshot. Event times are stored as local ISO
+    timestamps with their UTC offset; tasks as tasks.extract_tasks records.
+    """
+
+    def __init__(self, data: dict[str, Any]):
+        self.data         = data
+        self.created_at   = datetime.fromisoformat(data["created_at"])
+        self.window       = tuple(datetime.fromisoformat(t) for t in data["window"])
+        self.users        = data["users"]
+        self.assignees    = data["assignees"]
+        self.tasks        = data["tasks"]
+        # {"interval": minutes, "start": ISO date, "views": {user: availabilityView}} in availability mode
+        self.availability = data.get("availability")
+
+    @property
+    def today(self) -> date:
+        """The local date the snapshot was taken, which the reports' day ranges are based on."""
+        return self.created_at.astimezone(LOCAL_TZ).date()
+
+    def month_days(self, n: int = MONTH_SPAN_DAYS) -> list[date]:
+        first = self.today.replace(day=1)
+        return [first + timedelta(days=i) for i in range(n)]
+
+    def month_window(self) -> tuple[datetime, datetime]:
+        """[local midnight on the 1st, + MONTH_SPAN_DAYS), the span of outlook_events.csv."""
+        start_dt = LOCAL_TZ.localize(datetime.combine(self.today.replace(day=1), time(0, 0)))
+        return start_dt, start_dt + timedelta(days=MONTH_SPAN_DAYS)
+
+    def _events(self, user: str):
+        if self.data["events"] is None:
+            raise ValueError("Snapshot was taken without calendars; re-run the extraction with --sources calendar")
+        if user not in self.data["events"]:
+            raise KeyError(f"{user} is not in the snapshot; re-run the extraction with them in OUTLOOK_USER_EMAIL")
+        for subject, start, end, show_as in self.data["events"][user]:
+            yield subject, datetime.fromisoformat(start), datetime.fromisoformat(end), show_as
+
+    def slot_events(self, user: str, days: list[date]) -> list[dict[str, Any]]:
+        """
+        The user's events starting on `days`, in the dict shape the slot grids
+        take. Events without a subject are labelled NO_SUBJECT here, not in the
+        snapshot, so outlook_events.csv keeps them blank.
+        """
+        wanted = set(days)
+        return [
+            {
+                "subject": subject or NO_SUBJECT, "date": s.date(),
+                "start_time": s.time(), "end_time": e.time(), "show_as": show_as,
+            }
+            for subject, s, e, show_as in self._events(user)
+            if e > s and s.date() in wanted
+        ]
+
+    def events_frame(self, users: list[str], start_dt: datetime, end_dt: datetime) -> pd.DataFrame:
+        """Events overlapping [start_dt, end_dt) as EVENT_COLUMNS rows, per user in start order."""
+        rows = []
+        for user in users:
+            evs = sorted(
+                ((s, e, subject) for subject, s, e, _ in self._events(user) if e > s and s < end_dt and e > start_dt),
+                key=lambda ev: ev[0],
+            )
+            rows += [(user, s.date(), s, e, subject or "") for s, e, subject in evs]
+        return pd.DataFrame(rows, columns=EVENT_COLUMNS)
+
+    def task_dict(self, days: list[date], excluded_lists=()) -> dict[str, list[dict[str, Any]]]:
+        if self.tasks is None:
+            raise ValueError("Snapshot was taken without ClickUp tasks; re-run the extraction with --sources clickup")
+        # Overdue tasks are judged against the UTC date, as ClickUp due dates are
+        return task_dict_for(
+            self.tasks, days, self.assignees + ["Unassigned"], excluded_lists,
+            today=self.created_at.astimezone(timezone.utc).date(),
+        )
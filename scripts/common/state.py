@@ -0,0 +1,42 @@
+"""
+state.py
+Small JSON state files (sync watermarks, cached snapshots) that persist
+between pipeline runs.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+STATE_DIR = os.getenv("PIPELINE_STATE_DIR", "./data/.state")
+
+
+def state_path(name: str) -> str:
+    return os.path.join(STATE_DIR, name)
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_json(path: str, data: Any, mode: int = 0o666) -> None:
+    """
+    Write via a temp file + rename so a crashed run never leaves half a file behind.
+    `mode` (less the umask) applies from the moment the temp file exists, so a
+    restricted file such as a cached token is never readable by anyone else.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    fd  = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    if mode != 0o666:
+        # O_CREAT leaves the mode of a temp file left behind by an earlier run alone
+        os.fchmod(fd, mode)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
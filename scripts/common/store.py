@@ -0,0 +1,99 @@
+"""
+store.py
+Columnar store for the schedule extracts: Parquet datasets partitioned by
+month and user in the hive layout (calendar_events/month=2026-10/user_email=.../),
+with typed timestamp/date columns and dictionary-encoded (categorical)
+strings. Writers replace the whole months they cover, so earlier months
+stay in place; readers load just the columns and partitions they ask for.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from datetime import date
+from typing import Any, Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+STORE_DIR = os.getenv("SCHEDULE_STORE_DIR", "./data/store")
+
+# One row per calendar event (outlook_to_csv.py), partitioned by month and user_email
+EVENTS_STORE = os.path.join(STORE_DIR, "calendar_events")
+# One row per user per half-hour report slot (extract_report_csv.py), partitioned by month and user
+SLOTS_STORE = os.path.join(STORE_DIR, "calendar_slots")
+
+
+def month_key(values: pd.Series) -> pd.Series:
+    """"YYYY-MM" partition key of dates or (local) timestamps."""
+    return pd.to_datetime(values).dt.strftime("%Y-%m")
+
+
+def months_spanning(first: date, last: date) -> list[str]:
+    """Partition keys of every month from `first` to `last` inclusive."""
+    return pd.period_range(first, last, freq="M").strftime("%Y-%m").tolist()
+
+
+def write_partitions(df: pd.DataFrame, path: str, time_column: str, user_column: str, months: list[str]) -> None:
+    """
+    Replaces `months` ("YYYY-MM") of the dataset at `path` with the rows of
+    `df`, partitioned by the month of `time_column` and by `user_column`.
+    Each month's directory is cleared first, so a user-month left without
+    rows (cancelled events, a user no longer extracted) doesn't keep its old
+    files; months not listed are left untouched.
+    """
+    keys = month_key(df[time_column])
+    outside = sorted(set(keys) - set(months))
+    if outside:
+        raise ValueError(f"Rows fall outside the months being written: {', '.join(outside)}")
+
+    for month in months:
+        shutil.rmtree(os.path.join(path, f"month={month}"), ignore_errors=True)
+    if df.empty:
+        return
+
+    table = pa.Table.from_pandas(df.assign(month=keys), preserve_index=False)
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("month", pa.string()), (user_column, pa.string())]), flavor="hive"),
+        existing_data_behavior="overwrite_or_ignore",
+        basename_template="part-{i}.parquet",
+    )
+
+
+def read_partitions(
+    path: str,
+    columns: list[str] | None = None,
+    months: Iterable[str] | None = None,
+    users: Iterable[str] | None = None,
+    where: dict[str, Any] | None = None,
+) -> pd.DataFrame:
+    """
+    The rows of the dataset at `path`, reading only `columns`. `months`
+    ("YYYY-MM") and `users` prune whole partitions before any file is opened;
+    `where` keeps rows whose columns equal the given values, pushed down to
+    the Parquet reader. Partition keys come back as categoricals.
+    """
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"No schedule store at {path}; run the extract that writes it first")
+
+    dataset = ds.dataset(path, format="parquet", partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+    user_column = dataset.partitioning.schema.names[1]
+
+    conditions = []
+    if months is not None:
+        conditions.append(ds.field("month").isin(list(months)))
+    if users is not None:
+        conditions.append(ds.field(user_column).isin(list(users)))
+    for column, value in (where or {}).items():
+        conditions.append(ds.field(column) == value)
+
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
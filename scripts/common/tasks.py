@@ -0,0 +1,163 @@
+"""
+tasks.py
+ClickUp task extraction for the schedule reports, split in two: one pass
+that collects every task in a reportable status (with the due date it
+inherits from its parents), and a per-report step that applies the list
+rules and buckets those tasks by assignee for a given run of days.
+
+A bucketed task carries the span of report days it shows on as a single
+inclusive (start, end) pair rather than a list of every date in it.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from typing import Any, Iterable, NamedTuple
+
+from .clickup import ClickUpClient, walk_task_tree
+
+# Every status any list shows; list_rules() narrows it per list
+REPORT_STATUSES = {"IN PROGRESS", "TO DO", "REVIEW"}
+
+
+class Span(NamedTuple):
+    start: date
+    end:   date
+
+    def contains(self, day: date) -> bool:
+        return self.start <= day <= self.end
+
+
+def _to_date(ms: Any) -> date | None:
+    return datetime.fromtimestamp(int(ms) / 1000, tz=timezone.utc).date() if ms else None
+
+
+def list_rules(list_name: str) -> tuple[set[str], bool]:
+    """(statuses shown, restrict) for a list; restricted lists hide unassigned and overdue tasks."""
+    if list_name == "freshdesk":
+        return {"IN PROGRESS", "TO DO", "REVIEW"}, False
+    return {"IN PROGRESS", "REVIEW"}, True
+
+
+# ---------------------------------------------------------------------------
+# Extraction
+# ---------------------------------------------------------------------------
+
+def extract_tasks(clickup: ClickUpClient, space_ids: list[str], mode: str = "crawl") -> list[dict[str, Any]]:
+    """
+    Every task in REPORT_STATUSES across `space_ids`, in hierarchy order, as
+    plain records: id, name, list (lower-cased), is_sub, link, status,
+    due (ISO date, inherited from the nearest dated ancestor) and assignees.
+    """
+    records = []
+
+    # Returns the task's effective due date, which its subtasks inherit
+    def visit(t, is_sub, parent_due, list_name):
+        due = _to_date(t.get("due_date")) or parent_due
+        status = (t.get("status", {}) or {}).get("status", "").upper()
+        if status in REPORT_STATUSES:
+            records.append({
+                "id":        t.get("id"),
+                "name":      t.get("name", "Untitled"),
+                "list":      list_name,
+                "is_sub":    is_sub,
+                "link":      t.get("url"),
+                "status":    status,
+                "due":       due.isoformat() if due else None,
+                "assignees": [a.get("username", "") for a in t.get("assignees", [])],
+            })
+        return due
+
+    if mode == "filtered":
+        # Status and space filters run server-side. Assignee bucketing and due dates stay
+        # client-side: the Unassigned column and undated tasks can't be expressed as ClickUp filters
+        walk_task_tree(
+            clickup.iter_filtered_tasks(space_ids, REPORT_STATUSES),
+            lambda t, is_sub, parent_due: visit(
+                t, is_sub, parent_due, (t.get("list") or {}).get("name", "").lower()),
+            orphan_ctx=lambda parent_id: _to_date(clickup.inherited_due_date(parent_id)),
+        )
+        return records
+
+    # Folders, lists and task pages are fetched concurrently under one rate limiter.
+    # Subtasks come back in the paged list response (subtasks=true), so the tree is
+    # rebuilt from each task's `parent` as the pages stream in
+    for lst, tasks in clickup.crawl_tasks(space_ids):
+        lname = lst.get("name", "").lower()
+        walk_task_tree(tasks, lambda t, is_sub, parent_due: visit(t, is_sub, parent_due, lname))
+
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Per-report view
+# ---------------------------------------------------------------------------
+
+def task_dict_for(
+    tasks: Iterable[dict[str, Any]],
+    days: list[date],
+    assignees: list[str],
+    excluded_lists: Iterable[str] = (),
+    today: date | None = None,
+) -> dict[str, list[dict[str, Any]]]:
+    """
+    Buckets extracted tasks by assignee with the span of `days` (sorted) each
+    task is shown on: from the first day up to its due date, or the first day
+    only when an overdue task may still show. `assignees` must include
+    "Unassigned", which collects everyone else.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    excluded = set(excluded_lists)
+    task_dict = {a: [] for a in assignees}
+    seen = {a: set() for a in assignees}
+
+    def span_for(due, allow_overdue):
+        if not due:
+            return Span(days[0], days[-1])
+        if due >= days[0]:
+            # Up to the last report day on or before the due date
+            return Span(days[0], days[bisect_right(days, due) - 1])
+        return Span(days[0], days[0]) if allow_overdue else None
+
+    for t in tasks:
+        if t["list"] in excluded:
+            continue
+        allowed, restrict = list_rules(t["list"])
+        due = date.fromisoformat(t["due"]) if t["due"] else None
+        task_assignees = t["assignees"] or ["Unassigned"]
+
+        if restrict and ("Unassigned" in task_assignees or (due and due < today)):
+            continue
+        if t["status"] not in allowed:
+            continue
+
+        span = span_for(due, not restrict) if days else None
+        if span is None:
+            continue
+
+        name = f"(Subtask) {t['name']}" if t["is_sub"] else f"[{t['list']}] {t['name']}"
+        for a in task_assignees:
+            target = a if a in task_dict else "Unassigned"
+            if t["id"] not in seen[target]:
+                task_dict[target].append({"name": name, "span": span, "id": t["id"], "link": t["link"]})
+                seen[target].add(t["id"])
+
+    return task_dict
+
+
+class SpanIndex:
+    """
+    Spans sorted by end date, so the ones still running on a day are a suffix
+    found by bisection and only those are checked against it.
+    """
+
+    def __init__(self, spans: Iterable[Span]):
+        self._spans = list(spans)
+        self._order = sorted(range(len(self._spans)), key=lambda i: self._spans[i].end)
+        self._ends  = [self._spans[i].end for i in self._order]
+
+    def active_on(self, day: date) -> list[int]:
+        """Positions (in input order) of the spans containing `day`."""
+        lo = bisect_left(self._ends, day)
+        return sorted(i for i in self._order[lo:] if self._spans[i].contains(day))
@@ -0,0 +1,164 @@
+"""
+extract_snapshot.py
+Extraction stage for the schedule reports: pulls every user's calendar and
+the ClickUp tasks once, over the widest window any report needs, and writes
+the snapshot that the workbook, CSV and Snowflake renderers read.
+
+Run:
+    python scripts/extract_snapshot.py [--mode full|incremental] [--sources calendar,clickup]
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# .env is for local runs (the report workflow doesn't install python-dotenv); it's
+# loaded before the common modules, which read their settings on import
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common.calendars import clear_delta_state, fetch_calendars, sync_calendars, DELTA_STATE_FILE
+from common.clickup import ClickUpClient
+from common.graph import GraphTokenProvider, get_schedules
+from common.http_client import http
+from common.snapshot import LOCAL_TZ, snapshot_window, write_snapshot
+from common.state import write_json
+from common.tasks import extract_tasks
+
+# -------------------- ENV SETUP --------------------
+
+# "crawl" walks every list; "filtered" uses ClickUp's workspace-level task search
+CLICKUP_EXTRACT_MODE = os.getenv("CLICKUP_EXTRACT_MODE", "crawl")
+
+OUTLOOK_USER_EMAIL = [u.strip() for u in os.environ["OUTLOOK_USER_EMAIL"].split(",") if u.strip()]
+TENANT_ID = os.environ["TENANT_ID"]
+CLIENT_ID = os.environ["CLIENT_ID"]
+CLIENT_SECRET = os.environ["CLIENT_SECRET"]
+# "events" downloads every user's calendar events; "availability" gets a free/busy
+# grid (plus the busy items' subjects) for all users from a few getSchedule calls
+CALENDAR_EXTRACT_MODE = os.getenv("CALENDAR_EXTRACT_MODE", "events")
+SLOT_MINUTES = 30
+
+# Users whose calendars are fetched at the same time
+OUTLOOK_MAX_WORKERS = int(os.getenv("OUTLOOK_MAX_WORKERS", "8"))
+
+graph_tokens = GraphTokenProvider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+
+# -------------------- CALENDARS --------------------
+def from_utc(value):
+    # calendarView is read without an outlook.timezone preference, so times come back in naive UTC
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).astimezone(LOCAL_TZ).isoformat()
+
+def from_local(value):
+    return LOCAL_TZ.localize(datetime.fromisoformat(value)).isoformat()
+
+def extract_events(mode, start_dt, end_dt):
+    """({user: [[subject, start, end, showAs]]}, delta state to save or None)."""
+    token = graph_tokens.token()
+    with ThreadPoolExecutor(max_workers=OUTLOOK_MAX_WORKERS) as pool:
+        if mode == "incremental":
+            entries = sync_calendars(token, OUTLOOK_USER_EMAIL, start_dt, end_dt, pool)
+            calendars = {u: list(entries[u]["events"].values()) for u in OUTLOOK_USER_EMAIL}
+        else:
+            entries = None
+            calendars = fetch_calendars(token, OUTLOOK_USER_EMAIL, start_dt, end_dt, pool)
+
+    events = {
+        u: [[ev.subject, from_utc(ev.start), from_utc(ev.end), ev.show_as] for ev in calendars[u]]
+        for u in OUTLOOK_USER_EMAIL
+    }
+    return events, entries
+
+def extract_availability(start_dt, end_dt):
+    """({user: [[subject, start, end, status]]}, availability views) from getSchedule."""
+    schedules = get_schedules(
+        graph_tokens.token(), OUTLOOK_USER_EMAIL,
+        start_dt.replace(tzinfo=None), end_dt.replace(tzinfo=None),
+        interval_minutes=SLOT_MINUTES, time_zone="Africa/Johannesburg",
+    )
+    # Item times are already local (requested in Africa/Johannesburg); "Busy" keeps
+    # subject-less items counted wherever a cell's text decides whether it's busy
+    events = {
+        u: [[ev.subject or "Busy", from_local(ev.start), from_local(ev.end), ev.show_as] for ev in sched.items]
+        for u, sched in schedules.items()
+    }
+    availability = {
+        "interval": SLOT_MINUTES,
+        "start": start_dt.date().isoformat(),
+        "views": {u: sched.availability for u, sched in schedules.items()},
+    }
+    return events, availability
+
+# -------------------- CLICKUP --------------------
+def extract_clickup():
+    """(assignees, task records); the ClickUp settings are only required when it's extracted."""
+    clickup = ClickUpClient(os.environ["CLICKUP_TOKEN"])
+    space_ids = [s.strip() for s in os.environ["CLICKUP_SPACE_IDS"].split(",") if s.strip()]
+    assignees = [a.strip() for a in os.environ["CLICKUP_ASSIGNEES"].split(",") if a.strip()]
+    return assignees, extract_tasks(clickup, space_ids, CLICKUP_EXTRACT_MODE)
+
+# -------------------- MAIN --------------------
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mode",
+        choices=["full", "incremental"],
+        default=os.getenv("SNAPSHOT_SYNC_MODE", "full"),
+        help="incremental: apply calendarView delta changes to the stored events since the last run "
+             "(events calendar mode only)",
+    )
+    parser.add_argument(
+        "--sources",
+        default=os.getenv("SNAPSHOT_SOURCES", "calendar,clickup"),
+        help="comma-separated sources to extract, any of: calendar, clickup",
+    )
+    args = parser.parse_args()
+
+    sources = {s.strip() for s in args.sources.split(",") if s.strip()}
+    unknown = sources - {"calendar", "clickup"}
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(sorted(unknown))}")
+    # getSchedule has no delta query, so an incremental run would quietly be a full pull
+    if "calendar" in sources and CALENDAR_EXTRACT_MODE == "availability" and args.mode == "incremental":
+        parser.error("--mode incremental needs CALENDAR_EXTRACT_MODE=events; availability mode always pulls in full")
+
+    print(f"Started → {datetime.now(LOCAL_TZ)}")
+    start_dt, end_dt = snapshot_window()
+
+    # A source left out is stored as None, so a renderer that needs it fails loudly
+    events, entries, availability = None, None, None
+    if "calendar" in sources and CALENDAR_EXTRACT_MODE == "availability":
+        events, availability = extract_availability(start_dt, end_dt)
+    elif "calendar" in sources:
+        events, entries = extract_events(args.mode, start_dt, end_dt)
+
+    assignees, tasks = extract_clickup() if "clickup" in sources else ([], None)
+
+    path = write_snapshot({
+        "window": [start_dt.isoformat(), end_dt.isoformat()],
+        "calendar_mode": CALENDAR_EXTRACT_MODE,
+        "users": OUTLOOK_USER_EMAIL,
+        "events": events,
+        "availability": availability,
+        "assignees": assignees,
+        "tasks": tasks,
+    })
+
+    # Only after the snapshot is written, so a failed run replays the same changes
+    if entries is not None:
+        write_json(DELTA_STATE_FILE, entries)
+    elif events is not None and availability is None:
+        clear_delta_state()
+
+    print(f"Snapshot written to: {path}")
+    print(http.latency_report())
+    print(f"Finished → {datetime.now(LOCAL_TZ)}")
+
+if __name__ == "__main__":
+    main()
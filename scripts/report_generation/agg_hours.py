@@ -1,103 +1,168 @@
+import os
+import sys
+import argparse
 import pandas as pd
-from datetime import datetime
+from typing import NamedTuple
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.snapshot import load_snapshot
+from common.store import SLOTS_STORE, read_partitions
+from extract_report_csv import calendar_flat_frame
 
 SOURCE_FILE = "./data/calendar_flat.csv"
 OUTPUT_FILE = "./data/Aggregated_Hours.xlsx"
 
-df = pd.read_csv(SOURCE_FILE)
-
-# --- Clean + standardize ---
-df["date"] = pd.to_datetime(df["date"]).dt.date
-df["time"] = pd.to_datetime(df["time"], format="%H:%M").dt.time
-df["user"] = df["user"].astype(str)
-df["subject"] = df["subject"].fillna("").astype(str)
-df["is_busy"] = df["is_busy"].astype(int)
-
-# --- Filter ---
-df = df[(df["date"] >= df["date"].min()) & (df["date"] <= df["date"].max())]
-df = df[pd.to_datetime(df["date"]).dt.weekday < 5]
-
-# --- Fact table ---
-fact_df = df[df["is_busy"] == 1].copy()
-fact_df["Hours"] = 0.5
-
-fact_df.rename(columns={
-    "date": "Date",
-    "user": "Team Member",
-    "subject": "Task"
-}, inplace=True)
-
-fact_df["Date"] = pd.to_datetime(fact_df["Date"])
-
-team_members = sorted(fact_df["Team Member"].unique())
-team_members_df = pd.DataFrame({"Team Member": team_members})
-
-# --- Daily ---
-daily = (
-    fact_df
-    .groupby(["Date", "Team Member"])["Hours"]
-    .sum()
-    .reset_index()
-)
-
-daily_pivot = (
-    daily
-    .pivot(index="Date", columns="Team Member", values="Hours")
-    .fillna(0)
-    .reindex(columns=team_members, fill_value=0)
-    .sort_index()
-)
-
-# --- Monthly ---
-fact_df["MonthDate"] = fact_df["Date"].dt.to_period("M").dt.to_timestamp()
-
-monthly = (
-    fact_df
-    .groupby(["Team Member", "MonthDate"])["Hours"]
-    .sum()
-    .reset_index()
-)
-
-monthly_pivot = (
-    monthly
-    .pivot(index="Team Member", columns="MonthDate", values="Hours")
-    .fillna(0)
-    .reindex(index=team_members, fill_value=0)
-    .sort_index(axis=1)
-)
-
-monthly_pivot.columns = [d.strftime("%B %Y") for d in monthly_pivot.columns]
-
-with pd.ExcelWriter(OUTPUT_FILE, engine="openpyxl") as writer:
+# Every busy calendar_flat row is one half-hour slot
+SLOT_HOURS = 0.5
+GRAIN = ["Date", "Team Member", "Task"]
+
+# --source csv reads the file in chunks of this many rows, with only the columns
+# the report needs and compact types
+CSV_CHUNK_ROWS = int(os.getenv("AGG_CSV_CHUNK_ROWS", "250000"))
+CSV_DTYPES = {"date": "string", "user": "category", "subject": "string", "is_busy": "int8"}
+
+class Report(NamedTuple):
+    team_members: list
+    daily_pivot: pd.DataFrame     # Date x Team Member
+    monthly_pivot: pd.DataFrame   # Team Member x "Month YYYY"
+    member_tasks: pd.Series       # (Team Member, Task) -> Hours, each member's tasks busiest first
+
+# --- Fact grain ---
+def slot_grain(df):
+    """
+    Busy weekday slots counted per (Date, Team Member, Task) in one grouped
+    pass over categorical-coded keys; every report table is derived from this.
+    """
+    # Free slots are dropped before any date parsing
+    df = df[df["is_busy"].astype(int) == 1]
+    dates = pd.to_datetime(df["date"])
+    keep = dates.dt.weekday < 5
+
+    keys = pd.DataFrame({
+        "Date": pd.Categorical(dates[keep]),
+        "Team Member": pd.Categorical(df["user"][keep].astype(str)),
+        "Task": pd.Categorical(df["subject"][keep].fillna("").astype(str)),
+    })
+    return keys.groupby(GRAIN, observed=True).size().rename("Slots")
+
+def store_grain(months, path=SLOTS_STORE):
+    """
+    slot_grain() of the calendar slot store: only the report's month
+    partitions are opened, only the four columns it needs are read, and free
+    slots are filtered out by the Parquet reader.
+    """
+    df = read_partitions(path, columns=list(CSV_DTYPES), months=months, where={"is_busy": 1})
+    return slot_grain(df.astype({"subject": "object"}))
+
+def csv_grain(path=SOURCE_FILE, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    slot_grain() of a calendar_flat CSV, streamed: each chunk is filtered and
+    counted as it's read, then folded into the running counts, so peak memory
+    is one chunk plus the grain rather than every slot in the file.
+    """
+    grain = None
+    for chunk in pd.read_csv(path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES, chunksize=chunk_rows):
+        part = slot_grain(chunk)
+        grain = part if grain is None else pd.concat([grain, part]).groupby(level=GRAIN, observed=True).sum()
+    return grain if grain is not None else slot_grain(pd.DataFrame(columns=list(CSV_DTYPES)))
+
+# --- Aggregates ---
+def build_report(grain):
+    hours = grain * SLOT_HOURS
+    team_members = sorted(hours.index.get_level_values("Team Member").unique())
+
+    # --- Daily ---
+    daily = hours.groupby(level=["Date", "Team Member"], observed=True).sum()
+    daily_pivot = (
+        daily.unstack("Team Member", fill_value=0)
+        .reindex(columns=team_members, fill_value=0)
+        .sort_index()
+    )
+
+    # --- Monthly ---
+    month = pd.DatetimeIndex(daily.index.get_level_values("Date")).to_period("M").to_timestamp()
+    monthly = daily.groupby([daily.index.get_level_values("Team Member"), month]).sum()
+    monthly_pivot = (
+        monthly.unstack(fill_value=0)
+        .reindex(index=team_members, fill_value=0)
+        .sort_index(axis=1)
+    )
+    monthly_pivot.columns = [d.strftime("%B %Y") for d in monthly_pivot.columns]
+
+    # --- Per-member tasks ---
+    member_tasks = hours.groupby(level=["Team Member", "Task"], observed=True).sum().reset_index(name="Hours")
+    member_tasks = (
+        member_tasks.sort_values(["Team Member", "Hours"], ascending=[True, False], kind="stable")
+        .set_index(["Team Member", "Task"])["Hours"]
+    )
+
+    return Report(team_members, daily_pivot, monthly_pivot, member_tasks)
+
+# --- Workbook ---
+def write_report(report, filename=OUTPUT_FILE):
+    # Write-only workbook: rows are streamed to disk sheet by sheet
+    wb = Workbook(write_only=True)
+
+    def header(ws, values):
+        cells = []
+        for v in values:
+            cell = WriteOnlyCell(ws, value=v)
+            cell.font = Font(bold=True)
+            cells.append(cell)
+        ws.append(cells)
+
     # --- Core sheets ---
-    team_members_df.to_excel(writer, sheet_name="Names", index=False)
-    daily_pivot.to_excel(writer, sheet_name="Daily Loads")
-    monthly_pivot.to_excel(writer, sheet_name="Monthly Aggregation")
+    ws = wb.create_sheet("Names")
+    header(ws, ["Team Member"])
+    for member in report.team_members:
+        ws.append([member])
+
+    ws = wb.create_sheet("Daily Loads")
+    header(ws, ["Date"] + report.team_members)
+    for day, row in zip(report.daily_pivot.index, report.daily_pivot.itertuples(index=False)):
+        ws.append([day.date()] + list(row))
+
+    ws = wb.create_sheet("Monthly Aggregation")
+    header(ws, ["Team Member"] + list(report.monthly_pivot.columns))
+    for member, row in zip(report.monthly_pivot.index, report.monthly_pivot.itertuples(index=False)):
+        ws.append([member] + list(row))
 
     # ------------------------------
     # Per - person drill down
     # ------------------------------
-    for member in team_members:
-        member_df = fact_df[fact_df["Team Member"] == member]
-
-        if member_df.empty:
-            continue
-
-        # Aggregate total hours per task
-        task_summary = (
-            member_df
-            .groupby("Task")["Hours"]
-            .sum()
-            .reset_index()
-            .sort_values(by="Hours", ascending=False)
-        )
-
-        # Optional: clean blank subjects
-        task_summary["Task"] = task_summary["Task"].replace("", "No Subject")
-        
-        sheet_name = member[:31]
-
-        task_summary.to_excel(writer, sheet_name=sheet_name, index=False)
-
-print(f"Output written → {OUTPUT_FILE}")
-
+    for member, tasks in report.member_tasks.groupby(level="Team Member", sort=False):
+        ws = wb.create_sheet(member[:31])
+        header(ws, ["Task", "Hours"])
+        for (_, task), task_hours in tasks.items():
+            ws.append([task or "No Subject", task_hours])
+
+    wb.save(filename)
+
+# --- Main ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--source",
+        choices=["store", "snapshot", "csv"],
+        default="store",
+        help=(
+            f"store: read the report months from {SLOTS_STORE}; "
+            f"snapshot: build the slot rows from the latest extraction snapshot; csv: stream {SOURCE_FILE} in chunks"
+        ),
+    )
+    parser.add_argument("--chunk-rows", type=int, default=CSV_CHUNK_ROWS, help="rows per chunk with --source csv")
+    args = parser.parse_args()
+
+    if args.source == "csv":
+        grain = csv_grain(SOURCE_FILE, args.chunk_rows)
+    elif args.source == "store":
+        # The store keeps earlier months; the report covers the latest snapshot's span
+        grain = store_grain(sorted({d.strftime("%Y-%m") for d in load_snapshot().month_days()}))
+    else:
+        grain = slot_grain(calendar_flat_frame(load_snapshot()))
+    write_report(build_report(grain))
+
+    print(f"Output written → {OUTPUT_FILE}")
@@ -1,39 +1,32 @@
 import os
-import requests
+import sys
+import argparse
 import pytz
+import numpy as np
 import pandas as pd
-from datetime import datetime, timezone, timedelta, time
+from datetime import date, datetime, timedelta, time
 from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-# from dotenv import load_dotenv
 
-# -------------------- ENV SETUP --------------------
-# load_dotenv(dotenv_path="./.env") # used for local machine testing
-
-CLICKUP_API_TOKEN = os.environ["CLICKUP_TOKEN"]
-SPACE_IDS = [s.strip() for s in os.environ["CLICKUP_SPACE_IDS"].split(",") if s.strip()]
-ASSIGNEES = [a.strip() for a in os.environ["CLICKUP_ASSIGNEES"].split(",") if a.strip()]
-ASSIGNEES_WITH_UNASSIGNED = ASSIGNEES + ["Unassigned"]
-
-OUTLOOK_USER_EMAIL = [e.strip() for e in os.environ["OUTLOOK_USER_EMAIL"].split(",")]
-TENANT_ID = os.environ["TENANT_ID"]
-CLIENT_ID = os.environ["CLIENT_ID"]
-CLIENT_SECRET = os.environ["CLIENT_SECRET"]
-
-CLICKUP_HEADERS = {"Authorization": CLICKUP_API_TOKEN}
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.graph import AVAILABILITY_FREE
+from common.slots import occupancy
+from common.snapshot import load_snapshot
+from common.store import SLOTS_STORE, months_spanning, write_partitions
 
 # Output paths
 OUTPUT_DIR = "./data"
 OUTPUT_CSV = os.path.join(OUTPUT_DIR, "calendar_flat.csv")
+DAY_SHEETS_XLSX = os.path.join(OUTPUT_DIR, "calendar_day_sheets.xlsx")
+CLICKUP_TASKS_CSV = os.path.join(OUTPUT_DIR, "clickup_tasks.csv")
+
+# Outputs this renderer can produce from the extraction snapshot; calendar_store holds
+# the calendar_flat rows as month/user Parquet partitions (see common/store.py)
+OUTPUTS = ("calendar_store", "calendar_flat", "day_sheets", "clickup_tasks")
+EXTRACT_OUTPUTS = os.getenv("EXTRACT_OUTPUTS", "calendar_store")
 
 LOCAL_TZ = pytz.timezone("Africa/Johannesburg")
 
 # -------------------- HELPERS --------------------
-def get_week_dates():
-    today = datetime.now(LOCAL_TZ).date()
-    first_day = today.replace(day=1)
-    return [first_day + timedelta(days=i) for i in range(92)]
-
 def generate_time_slots(start_hour=8, end_hour=18):
     slots = []
     current = datetime.combine(datetime.now(LOCAL_TZ), time(start_hour, 0))
@@ -46,183 +39,118 @@ def generate_time_slots(start_hour=8, end_hour=18):
 def email_to_name(email):
     return " ".join(p.capitalize() for p in email.split("@")[0].split("."))
 
-# -------------------- CLICKUP --------------------
-def get_folders(space_id):
-    return requests.get(f"https://api.clickup.com/api/v2/space/{space_id}/folder", headers=CLICKUP_HEADERS).json().get("folders", [])
-
-def get_lists_in_folder(folder_id):
-    return requests.get(f"https://api.clickup.com/api/v2/folder/{folder_id}/list", headers=CLICKUP_HEADERS).json().get("lists", [])
-
-def get_lists_directly_in_space(space_id):
-    return requests.get(f"https://api.clickup.com/api/v2/space/{space_id}/list", headers=CLICKUP_HEADERS).json().get("lists", [])
-
-def get_tasks(list_id):
-    return requests.get(f"https://api.clickup.com/api/v2/list/{list_id}/task?subtasks=true", headers=CLICKUP_HEADERS).json().get("tasks", [])
-
-def fetch_clickup_tasks():
-    now = datetime.now(timezone.utc)
-    weekdays = get_week_dates()
-    task_dict = {a: [] for a in ASSIGNEES_WITH_UNASSIGNED}
-    seen = {a: set() for a in ASSIGNEES_WITH_UNASSIGNED}
-
-    def build_sheet_dates(due, allow_overdue):
-        if not due:
-            return weekdays
-        days = [d for d in weekdays if d <= due]
-        return days or ([weekdays[0]] if allow_overdue else [])
-
-    def push(task_id, name, link, assignees, sheet_dates):
-        for a in assignees:
-            target = a if a in ASSIGNEES_WITH_UNASSIGNED else "Unassigned"
-            if task_id not in seen[target]:
-                task_dict[target].append({
-                    "name": name,
-                    "sheet_dates": sheet_dates,
-                    "id": task_id,
-                    "link": link
-                })
-                seen[target].add(task_id)
-
-    def add_task(t, allowed, list_name, restrict=False, is_sub=False, parent_due=None):
-        tid = t.get("id")
-        status = (t.get("status", {}) or {}).get("status", "").upper()
-        due = datetime.fromtimestamp(int(t["due_date"]) / 1000, tz=timezone.utc).date() if t.get("due_date") else parent_due
-        assignees = [a.get("username", "") for a in t.get("assignees", [])] or ["Unassigned"]
-
-        if restrict and ("Unassigned" in assignees or (due and due < now.date())):
-            for sub in get_tasks(tid):
-                add_task(sub, allowed, list_name, restrict, True, due)
-            return
-
-        if status in allowed:
-            sheet_dates = build_sheet_dates(due, not restrict)
-            if sheet_dates:
-                name = f"(Subtask) {t.get('name','Untitled')}" if is_sub else f"[{list_name}] {t.get('name','Untitled')}"
-                push(tid, name, t.get("url"), assignees, sheet_dates)
-
-        for sub in get_tasks(tid):
-            add_task(sub, allowed, list_name, restrict, True, due)
-
-    for space_id in SPACE_IDS:
-        for folder in get_folders(space_id):
-            for lst in get_lists_in_folder(folder["id"]):
-                lname = lst.get("name", "").lower()
-                for t in get_tasks(lst["id"]):
-                    if lname == "freshdesk":
-                        add_task(t, {"IN PROGRESS", "TO DO", "REVIEW"}, lname)
-                    else:
-                        add_task(t, {"IN PROGRESS", "REVIEW"}, lname, restrict=True)
-
-        for lst in get_lists_directly_in_space(space_id):
-            lname = lst.get("name", "").lower()
-            for t in get_tasks(lst["id"]):
-                if lname == "freshdesk":
-                    add_task(t, {"IN PROGRESS", "TO DO", "REVIEW"}, lname)
-                else:
-                    add_task(t, {"IN PROGRESS", "REVIEW"}, lname, restrict=True)
-
-    return task_dict
-
-# -------------------- OUTLOOK --------------------
-def get_outlook_events(user):
-    token_url = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
-    token_data = {
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "scope": "https://graph.microsoft.com/.default",
-        "grant_type": "client_credentials",
-    }
-
-    access_token = requests.post(token_url, data=token_data).json()["access_token"]
-
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Prefer": 'outlook.timezone="Africa/Johannesburg"',
-    }
-
-    weekdays = get_week_dates()
-
-    url = (
-        f"https://graph.microsoft.com/v1.0/users/{user}/calendarview"
-        f"?startDateTime={weekdays[0]}T00:00:00Z"
-        f"&endDateTime={weekdays[-1]}T23:59:59Z&$top=1000"
-    )
-
-    events = requests.get(url, headers=headers).json().get("value", [])
-
-    formatted = []
-    for ev in events:
-        start_dt = datetime.fromisoformat(ev["start"]["dateTime"]).astimezone(LOCAL_TZ)
-        end_dt = datetime.fromisoformat(ev["end"]["dateTime"]).astimezone(LOCAL_TZ)
-
-        # filter useless events
-        if (end_dt - start_dt).total_seconds() <= 0:
-            continue
-
-        formatted.append({
-            "subject": ev.get("subject", "No subject"),
-            "date": start_dt.date(),
-            "start_time": start_dt.time(),
-            "end_time": end_dt.time(),
-        })
-
-    return formatted
+# -------------------- GRIDS --------------------
+def availability_busy(snapshot, weekdays, time_slots):
+    """(users, days, slots) busy grid read straight from the snapshot's getSchedule views."""
+    availability = snapshot.availability
+    slots_per_day = 24 * 60 // availability["interval"]
+    # Views start on the snapshot window's first day, which can be before the report's
+    offset = (weekdays[0] - date.fromisoformat(availability["start"])).days * slots_per_day
+    width = len(weekdays) * slots_per_day
+    view_cols = [(slot.hour * 60 + slot.minute) // availability["interval"] for slot in time_slots]
+    return np.stack([
+        (np.frombuffer(
+            availability["views"][u][offset:offset + width].ljust(width, AVAILABILITY_FREE).encode(),
+            dtype=np.uint8,
+        ).reshape(len(weekdays), slots_per_day)[:, view_cols] != ord(AVAILABILITY_FREE))
+        for u in snapshot.users
+    ])
+
+def calendar_flat_frame(snapshot, subjects=None):
+    """calendar_flat rows (date, time, user, subject, is_busy) for the snapshot's three-month span."""
+    weekdays = snapshot.month_days()
+    time_slots = generate_time_slots()
+    user_names = [email_to_name(u) for u in snapshot.users]
+    slot_labels = [slot.strftime("%H:%M") for slot in time_slots]
+
+    if subjects is None:
+        subjects = occupancy([snapshot.slot_events(u, weekdays) for u in snapshot.users], weekdays, time_slots).subjects
+    busy = subjects != "" if snapshot.availability is None else availability_busy(snapshot, weekdays, time_slots)
+
+    # Rows run day -> slot -> user, so the grid is laid out (days, slots, users) and flattened
+    n_days, n_slots, n_users = len(weekdays), len(time_slots), len(snapshot.users)
+    return pd.DataFrame({
+        "date": np.repeat(np.array(weekdays, dtype=object), n_slots * n_users),
+        "time": np.tile(np.repeat(slot_labels, n_users), n_days),
+        "user": np.tile(user_names, n_days * n_slots),
+        "subject": subjects.transpose(1, 2, 0).ravel(),
+        "is_busy": busy.transpose(1, 2, 0).ravel().astype(int),
+    })
+
+# -------------------- RENDERERS --------------------
+def write_day_sheets(weekdays, slot_labels, user_names, subjects, filename=DAY_SHEETS_XLSX):
+    wb = Workbook(write_only=True)
+    for day_idx, day in enumerate(weekdays):
+        ws = wb.create_sheet(title=f"{day.strftime('%A')} {day.isoformat()}")
+        ws.append(["Time"] + user_names)
+        for slot_idx, label in enumerate(slot_labels):
+            ws.append([label] + list(subjects[:, day_idx, slot_idx]))
+    wb.save(filename)
+    print(f"Day sheets written to {filename}")
+
+def write_calendar_store(frame, weekdays, path=SLOTS_STORE):
+    # Repeated labels and subjects are stored dictionary-encoded; dates stay dates
+    frame = frame.astype({"time": "category", "subject": "category", "is_busy": "int8"})
+    write_partitions(frame, path, time_column="date", user_column="user",
+                     months=months_spanning(weekdays[0], weekdays[-1]))
+    print(f"Calendar slots written to {path}")
+
+def write_clickup_tasks(task_dict, filename=CLICKUP_TASKS_CSV):
+    rows = [
+        {
+            "assignee": assignee,
+            "id": t["id"],
+            "name": t["name"],
+            "link": t["link"],
+            "first_date": t["span"].start,
+            "last_date": t["span"].end,
+        }
+        for assignee, tasks in task_dict.items()
+        for t in tasks
+    ]
+    pd.DataFrame(rows, columns=["assignee", "id", "name", "link", "first_date", "last_date"]).to_csv(filename, index=False)
+    print(f"ClickUp tasks written to {filename}")
 
 # -------------------- MAIN --------------------
-def run_extraction():
+def run_extraction(outputs=("calendar_store",)):
     print(f"Started → {datetime.now(LOCAL_TZ)}")
+    snapshot = load_snapshot()
+    weekdays = snapshot.month_days()
 
-    wb = Workbook()
-    if "Sheet" in wb.sheetnames:
-        wb.remove(wb.active)
-
-    all_events = {u: get_outlook_events(u) for u in OUTLOOK_USER_EMAIL}
-    task_dict = fetch_clickup_tasks()
+    if "clickup_tasks" in outputs:
+        write_clickup_tasks(snapshot.task_dict(weekdays))
 
-    weekdays = get_week_dates()
-    time_slots = generate_time_slots()
-
-    flat_rows = []
-
-    for day in weekdays:
-        sheet_name = f"{day.strftime('%A')} {day.isoformat()}"
-        ws = wb.create_sheet(title=sheet_name)
-
-        header = ["Time"] + [email_to_name(u) for u in OUTLOOK_USER_EMAIL]
-        ws.append(header)
-
-        for slot in time_slots:
-            row = [slot.strftime("%H:%M")]
-
-            for u in OUTLOOK_USER_EMAIL:
-                user_name = email_to_name(u)
-
-                evs = [
-                    ev["subject"]
-                    for ev in all_events[u]
-                    if ev["date"] == day and ev["start_time"] <= slot < ev["end_time"]
-                ]
+    if {"day_sheets", "calendar_flat", "calendar_store"} & set(outputs):
+        time_slots = generate_time_slots()
+        # (users, days, slots) grid of joined subjects, filled once for every user
+        subjects = occupancy([snapshot.slot_events(u, weekdays) for u in snapshot.users], weekdays, time_slots).subjects
 
-                subject = ", ".join(evs)
-                is_busy = 1 if subject else 0
+        if "day_sheets" in outputs:
+            slot_labels = [slot.strftime("%H:%M") for slot in time_slots]
+            write_day_sheets(weekdays, slot_labels, [email_to_name(u) for u in snapshot.users], subjects)
 
-                row.append(subject)
-
-                flat_rows.append({
-                    "date": day,
-                    "time": slot.strftime("%H:%M"),
-                    "user": user_name,
-                    "subject": subject,
-                    "is_busy": is_busy
-                })
-
-            ws.append(row)
-
-    df = pd.DataFrame(flat_rows)
-    df.to_csv(OUTPUT_CSV, index=False)
+        if "calendar_flat" in outputs or "calendar_store" in outputs:
+            frame = calendar_flat_frame(snapshot, subjects)
+            if "calendar_flat" in outputs:
+                frame.to_csv(OUTPUT_CSV, index=False)
+            if "calendar_store" in outputs:
+                write_calendar_store(frame, weekdays)
 
     print(f"Finished → {datetime.now(LOCAL_TZ)}")
 
 
 if __name__ == "__main__":
-    run_extraction()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--outputs",
+        default=EXTRACT_OUTPUTS,
+        help=f"comma-separated outputs to produce, any of: {', '.join(OUTPUTS)}",
+    )
+    args = parser.parse_args()
+
+    outputs = [o.strip() for o in args.outputs.split(",") if o.strip()]
+    unknown = [o for o in outputs if o not in OUTPUTS]
+    if unknown:
+        parser.error(f"unknown output(s): {', '.join(unknown)}")
+
+    run_extraction(outputs)